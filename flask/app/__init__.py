@@ -1,13 +1,15 @@
 import os
 import logging
 import logging.handlers
+import click
 from flask import Flask
 from flask_cors import CORS
 from flask.logging import default_handler
 from flask_wtf import CSRFProtect
 
-from .config import DevConfig, ProdConfig, BASEDIR
+from .config import DevConfig, ProdConfig, BASEDIR, REDIS_URL
 from .models import db
+from .models.team_logs import migrate_legacy_logs
 from .modules.socketio import socketio
 from .core import core
 
@@ -84,6 +86,30 @@ def app_load_blueprints(app: Flask) -> None:
     app.register_blueprint(haha)
     
     
+def app_load_commands(app: Flask) -> None:
+    """
+    Load all cli commands
+    
+    Parameters
+    ----------
+    app: :class:`Flask`
+        The flask app.
+    """
+    
+    from .core.metro import build_snapshot, refresh_snapshot
+    
+    @app.cli.command("build-metro")
+    @click.option("--refresh", is_flag=True, help="Download the latest data from TDX first.")
+    def build_metro(refresh: bool) -> None:
+        """Compile the metro snapshot from the local data files."""
+        
+        if refresh and not refresh_snapshot():
+            raise click.ClickException("Failed to refresh metro data from TDX.")
+        
+        snapshot = build_snapshot()
+        click.echo(f"Metro snapshot compiled with {len(snapshot['graph'])} stations.")
+    
+    
 def create_app() -> Flask:
     """
     Initialize the app.
@@ -99,11 +125,17 @@ def create_app() -> Flask:
     csrf = CSRFProtect(app)
     CORS(app)
     app_load_blueprints(app)
+    app_load_commands(app)
     db.init_app(app)
     # Use gevent in production (Docker), threading in development
     async_mode = 'gevent' if os.getenv("PRODUCTION", "False").lower() in ("true", "1", "t") else 'threading'
-    socketio.init_app(app, cors_allowed_origins="*", async_mode=async_mode)
+    # 多個worker時透過Redis轉送socketio訊息到其他worker的連線
+    socketio.init_app(app, cors_allowed_origins="*", async_mode=async_mode, message_queue=REDIS_URL)
+    core.init_app(app)
     core.init_socketio(socketio)
-    with app.app_context(): db.create_all()
+    with app.app_context():
+        db.create_all()
+        migrate_legacy_logs()
+        core.recover()
     
     return app
\ No newline at end of file
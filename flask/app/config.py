@@ -11,6 +11,7 @@ CLIENT_ID = os.getenv("CLIENT_ID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 REDIRECT_URI = os.getenv("REDIRECT_URI") or "/oauth/callback"
 SQLALCHEMY_DATABASE_URI = os.getenv("SQLALCHEMY_DATABASE_URI")
+REDIS_URL = os.getenv("REDIS_URL") # 設定後由多個worker共用遊戲狀態及socketio訊息
 OAUTH_URL = f"https://discord.com/oauth2/authorize?client_id={CLIENT_ID}&redirect_uri={REDIRECT_URI}&response_type=code&scope=identify+email"
 
 YELLOW_TEXT_COLOR = "\33[33m"
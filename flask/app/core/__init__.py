@@ -1,41 +1,117 @@
+import bisect
+import copy
+import functools
+import heapq
 import logging
 import random
-import requests
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta
+from threading import RLock
+from types import MappingProxyType
+from typing import Any, Callable, Iterator, Mapping
 
-import pygeohash as pgh
-from apscheduler.schedulers.background import BackgroundScheduler
+from flask import Flask, has_app_context
 from flask_socketio import SocketIO
 
-from ..game_config import ADMINS, CARD_COUNT, COLLAPSE, COLLAPSE_DAMAGE_INTERVAL, COLLAPSE_DAMAGE, COLLAPSE_LIST, END_STATION, DISTANCE, IMPRISONED_TIME, BACKUP_INTERVAL
+from ..game_config import ADMINS, CARD_COUNT, DICE_FACES, COLLAPSE, COLLAPSE_DAMAGE_INTERVAL, COLLAPSE_DAMAGE, END_STATION, IMPRISONED_TIME, BACKUP_INTERVAL, STATE_LOCK_TTL, STATE_LOCK_TIMEOUT
 from ..data import load_data
-from ..models import db
+from ..models import db, bulk_upsert
 from ..models.teams import Teams
+from ..models.team_logs import LOG_TABLES, load_team_logs
+from ..models.backups import load_backup_version, save_backup_version
 from .metro import MetroSystem
-from .team import Team
+from .team import Team, FIELDS as TEAM_FIELDS, PRIVATE_FIELDS, SECRET_FIELDS
 from .collapse import Collapse
+from .snapshot import GameSnapshot
+from .journal import Journal
+from .backend import LocalBackend, create_backend
+from .scheduler import Scheduler
 
 
 log = logging.getLogger(__name__)
 
+TEAMS_ROOM = "teams"
+"""The socketio room of every player."""
+
+ADMINS_ROOM = "admins"
+"""The socketio room of every team admin and game admin."""
+
+
+def team_room(name: str) -> str:
+    """The socketio room of the players of the team."""
+    
+    return f"team:{name}"
+
+TEAM_ROW_FIELDS = tuple(field for field in TEAM_FIELDS if field not in LOG_TABLES)
+"""The attributes of :class:`Team` saved in :class:`Teams`."""
+
+
+LEGACY_IMPRISONED_TIME_LIMIT = 100_000_000
+"""`imprisoned_time` below it is the remaining minutes saved by the old version, not the release time."""
+
+SNAPSHOT_RETRIES = 3
+"""The times to copy the state again when a change is made during the copy, before using the last complete snapshot."""
+
+
+def _locked(method: Callable) -> Callable:
+    
+    # 整個變動都在狀態鎖內完成，快照不會讀到一半的變動
+    @functools.wraps(method)
+    def wrapper(self: "Core", *args, **kwargs):
+        with self.lock():
+            return method(self, *args, **kwargs)
+        
+    return wrapper
+
 
 class Core:
-    def __init__(self) -> None:
+    def __init__(self, backend: LocalBackend | None=None) -> None:
         self.is_running = False
         # self.metro = MetroSystem() 改到start_game，讓隱藏站和占領狀態可被重置
+        self.app: Flask | None = None
         self.socketio = None
         self.teams: dict[str, Team] = {}
-        self.visited = []
-        self.choice: dict[int, list[str]] = {i: [] for i in range(1, 7)}
         self.collapse = Collapse()
-        self.collapse_list = COLLAPSE_LIST.copy()
-        self.collapse_scheduler = BackgroundScheduler()
-        self.prison_scheduler = BackgroundScheduler()
-
-        self.backup_scheduler = BackgroundScheduler()
-        self.auto_backup_secret = str(random.random())
+        self.journal = Journal()
+        self.backend = backend if backend is not None else create_backend()
+        self.scheduler = Scheduler(self.backend, before=self.sync_backend)
+        self.backup_metrics: dict[str, Any] = {
+            "count": 0, # 成功備份次數
+            "failures": 0,
+            "last_time": None,
+            "last_duration": None, # 秒
+            "last_rows": None, # 寫入的資料列數
+            "total_rows": 0,
+            "last_error": None,
+        }
 
-        self.unknown_players = []
+        self._lock = RLock()
+        self._lock_depth = 0 # 變動的巢狀層數，只在最外層取得共享的狀態鎖
+        self._seq = 0 # 變動進行中為奇數，快照前後比對，不需要鎖
+        self.members: dict[str, tuple[str, bool]] = {} # {player: (team name, is team admin)}
+        self._sessions: dict[str, set[str]] = {} # {player: socketio sid}，只有本worker的連線
+        self._session_rooms: dict[str, set[str]] = {} # {sid: rooms}
+        self._prison_queue: list[tuple[int, str]] = [] # [(release time, team)]，最早出獄的在最前面
+        self.unknown_players: set[str] = set()
+        
+        self.version: int = self.backend.current_version()
+        self.sync_version: int = self.version
+        self._publishing = False # recover之後才發布變動
+        # 套用中的紀錄的版本號，只影響套用中的執行緒或greenlet，其他請求的變動照常紀錄
+        self._applying: ContextVar[int | None] = ContextVar("applying", default=None)
+        self._field_versions: dict[str, dict[str, int]] = {} # {team: {field: changed version}}
+        self._log_marks: dict[str, list[tuple[int, int, int]]] = {} # {team: [(version, point_log count, event_log count)]}
+        self._saved_logs: dict[str, dict[str, tuple[list, int]]] = {} # {team: {attribute: (saved list, saved count)}}
+        self._saved_teams: dict[str, dict] = {} # {team: saved row}
+        self._snapshot_cache: dict[str, tuple[int, Mapping[str, Any]]] = {} # {team: (version, copied row)}
+        self._last_snapshot: GameSnapshot | None = None
+        
+        self.combos: list[dict] = []
+        self.combo_index: dict[str, list[dict]] = {} # {station: [combo]}
+        self.combo_progress: dict[str, dict[str, int]] = {} # {team: {combo: visited station count}}
+        self.load_combos()
         
         # 預先建立管理員隊伍
         # self.create_team("admins", admins=ADMINS.copy())
@@ -48,84 +124,491 @@ class Core:
         self.start_game()
         
         
+    def init_app(self, app: Flask) -> None:
+        """Set the flask app, the scheduled jobs run in its app context."""
+        
+        self.app = app
+        self.scheduler.app = app
+        
+        # 處理請求前先套用其他worker的變動
+        app.before_request(self.sync_backend)
+        
+        
     def init_socketio(self, socketio: SocketIO) -> None:
         self.socketio = socketio
         
         log.info("SocketIO initialized.")
         
-        self.init_collapse()
-        self.init_prison()
         
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """
+        Hold the state lock while changing the game state, the same thread can hold it again. \\
+        Only changes hold it, reading the state and :meth:`snapshot` never wait for it. \\
+        Views changing a team directly should hold it from checking the team to :meth:`notify_team`, \\
+        and do the slow computation before holding it.
+        
+        When the state is shared by many workers, the outermost holder also holds the `"state"` lock of the backend \\
+        and applies the changes of the other workers first, so the changes of every worker are made one by one \\
+        on the latest state and none of them is overwritten.
+        """
         
-    def init_collapse(self) -> None:
+        with self._write():
+            # 套用其他worker的紀錄時已在該worker的鎖內完成
+            shared = self._lock_depth == 1 and self.backend.shared and self._publishing and self._applying.get() is None
+            
+            if shared and not self.backend.wait_lock("state", STATE_LOCK_TTL, STATE_LOCK_TIMEOUT):
+                raise TimeoutError("Timed out waiting for the state lock held by another worker.")
+            
+            try:
+                if shared:
+                    self.sync_backend()
+                yield
+            finally:
+                if shared:
+                    self.backend.release_lock("state")
+                    
+                    
+    @contextmanager
+    def _write(self) -> Iterator[None]:
+        
+        # 只鎖本地的狀態，最外層的變動前後各加一次序號
+        with self._lock:
+            self._lock_depth += 1
+            if self._lock_depth == 1:
+                self._seq += 1
+                
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    self._seq += 1
+            
+            
+    def emit(self, event: str, data: Any=None, to: str | None=None) -> None:
+        """
+        Emit the socketio event if socketio is initialized.
         
-        if self.socketio is None:
-            log.error("SocketIO is not initialized.")
+        Parameters
+        ----------
+        event: :type:`str`
+            The name of the event.
+            
+        data: :type:`Any`
+            The data of the event.
+            
+        to: :type:`str`
+            The room to emit to. If not given, emit to everyone.
+        """
+        
+        # 其他worker的變動已由該worker透過訊息佇列發送
+        if self.socketio is None or self._applying.get() is not None:
+            return None
+        
+        self.socketio.emit(event, data, to=to)
+        
+        
+    @_locked
+    def notify_team(self, name: str, *fields: str) -> None:
+        """
+        Record the changed fields of the team as a new state version, \\
+        push them with the new log entries to the team and the admins, and the public fields to every player. \\
+        Every change of a team should call this, the delta sync and :meth:`snapshot` rely on the state version.
+        
+        Parameters
+        ----------
+        name: :type:`str`
+            The name of the team.
+            
+        fields: :type:`str`
+            The changed attributes of the team. e.g. `"point"`, `"location"`
+        """
+        
+        team = self.teams.get(name)
+        
+        if team is None:
+            return None
+        
+        marks = self._log_marks.setdefault(name, [])
+        _, point_count, event_count = marks[-1] if marks else (0, 0, 0)
+        fields = set(fields)
+        
+        # 紀錄被整個替換時需傳送完整紀錄
+        if len(team.point_log) < point_count:
+            fields.add("point_log")
+        if len(team.event_log) < event_count:
+            fields.add("event_log")
+            
+        if not fields and len(team.point_log) == point_count and len(team.event_log) == event_count:
+            return None
+        
+        data = self._team_delta(team, fields, point_count, event_count)
+        version = self._record({"type": "team", **data})
+        
+        field_versions = self._field_versions.setdefault(name, {})
+        for field in fields:
+            field_versions[field] = version
+            
+        marks.append((version, len(team.point_log), len(team.event_log)))
+        
+        self.emit("team_detail", data, to=[team_room(name), ADMINS_ROOM])
+        
+        public = self._public_delta(team, data)
+        if len(public) > 1:
+            self.emit("team_update", public, to=TEAMS_ROOM)
+        
+        
+    def _team_delta(self, team: Team, fields: set[str], point_count: int, event_count: int) -> dict[str, Any]:
+        
+        data: dict[str, Any] = {"name": team.name}
+        
+        for field in fields:
+            data[field] = getattr(team, field)
+            
+        # 紀錄只傳送新增的部分
+        if "point_log" not in data and len(team.point_log) > point_count:
+            data["new_point_log"] = team.point_log[point_count:]
+            
+        if "event_log" not in data and len(team.event_log) > event_count:
+            data["new_event_log"] = team.event_log[event_count:]
+            
+        return data
+    
+    
+    def _public_delta(self, team: Team, data: dict[str, Any]) -> dict[str, Any]:
+        
+        # 其他隊伍只需要紀錄數量，卡片及選項只推送給自己的隊伍
+        public = {field: value for field, value in data.items() if field not in PRIVATE_FIELDS and not field.startswith("new_")}
+        
+        if "point_log" in data or "new_point_log" in data:
+            public["point_log_count"] = len(team.point_log)
+        if "event_log" in data or "new_event_log" in data:
+            public["event_log_count"] = len(team.event_log)
+            
+        return public
+    
+    
+    def _record(self, record: dict[str, Any]) -> int:
+        """
+        Record a change as a new state version, write it to the journal and publish it to the other workers.
+        
+        Parameters
+        ----------
+        record: :type:`dict[str, Any]`
+            The change record with `type`, see :class:`Journal`.
+            
+        Returns
+        -------
+        version: :type:`int`
+            The state version of the change.
+        """
+        
+        # 套用其他worker或journal的紀錄時沿用該紀錄的版本號
+        applying = self._applying.get()
+        if applying is not None:
+            return applying
+        
+        if not self._publishing:
+            self.version += 1
+            return self.version
+        
+        self.version = self.backend.publish(record, self.version)
+        self.journal.append({**record, "version": self.version})
+        
+        return self.version
+    
+    
+    def _mark_sync(self, version: int) -> None:
+        
+        # 隊伍被新增、刪除或整份替換，舊版本無法只傳送變動，客戶端需重新抓取
+        self.version = max(self.version, version)
+        self.sync_version = version
+        
+        self._field_versions = {}
+        self._log_marks = {
+            name: [(version, len(team.point_log), len(team.event_log))]
+            for name, team in self.teams.items()
+        }
+        
+        self.emit("sync", to=TEAMS_ROOM)
+        
+        
+    def team_changes(self, name: str, since: int) -> dict[str, Any] | None:
+        """
+        Get the changes of the team after the state version.
+        
+        Parameters
+        ----------
+        name: :type:`str`
+            The name of the team.
+            
+        since: :type:`int`
+            The state version the client has. It should not be older than `sync_version`.
+            
+        Returns
+        -------
+        data: :type:`dict[str, Any]`
+            The changed fields with `name`. New log entries are in `new_point_log` and `new_event_log`.
+        """
+        
+        team = self.teams.get(name)
+        
+        if team is None:
+            return None
+        
+        fields = {field for field, version in self._field_versions.get(name, {}).items() if version > since}
+        
+        # 找出該版本時的紀錄數量
+        marks = self._log_marks.get(name, [])
+        index = bisect.bisect_right(marks, since, key=lambda mark: mark[0]) - 1
+        _, point_count, event_count = marks[index] if index >= 0 else (0, 0, 0)
+        
+        return self._team_delta(team, fields, point_count, event_count)
+    
+    
+    def changes(self, since: int) -> dict[str, Any] | None:
+        """
+        Get the changes of every team after the state version.
+        
+        Parameters
+        ----------
+        since: :type:`int`
+            The state version the client has.
+            
+        Returns
+        -------
+        data: :type:`dict[str, Any]` | :type:`None`
+            `None` if nothing changed.
+            
+            - version: :type:`int`
+                The current state version.
+                
+            - full: :type:`bool`
+                If `teams` are the full data. It happens when the version is too old or unknown.
+                
+            - teams: :type:`list[dict]`
+                The changed teams, see :meth:`team_changes`. The full data is :meth:`Team.summary`.
+        """
+        
+        if since == self.version:
             return None
         
-        if self.collapse_scheduler.running:
-            self.collapse_scheduler.shutdown()
+        if since < self.sync_version or since > self.version:
+            return {
+                "version": self.version,
+                "full": True,
+                "teams": [team.summary() for team in self.teams.values()],
+            }
+            
+        # 所有隊伍的變動是公開的，不含卡片及選項
+        teams = [
+            {field: value for field, value in self.team_changes(name, since).items() if field not in SECRET_FIELDS}
+            for name in self.teams.keys()
+        ]
+        
+        return {
+            "version": self.version,
+            "full": False,
+            "teams": [data for data in teams if len(data) > 1],
+        }
+        
+        
+    @_locked
+    def notify_station(self, name: str) -> None:
+        """
+        Push the owner and the hidden status of the station to every player. \\
+        The mission of a hidden station is not pushed, clients fetch it by `/api/station/<name>`.
         
-        for collapse in COLLAPSE:
+        Parameters
+        ----------
+        name: :type:`str`
+            The name of the station.
+        """
+        
+        station = self.metro.find_station(name)
+        
+        if station is None:
+            return None
+        
+        self.metro.invalidate_stations()
+        
+        data = {"name": station.name, "team": station.team, "hidden": station.hidden}
+        
+        self._record({"type": "station", **data})
+        self.emit("station_update", data, to=TEAMS_ROOM)
+        
+        
+    def _notify_collapse(self) -> None:
+        
+        data = {
+            "status": self.collapse.status,
+            "warning": self.collapse.warning,
+            "next_time": self.collapse.next_time,
+        }
+        
+        self._record({"type": "collapse", "stations": sorted(self.collapse.stations), **data})
+        self.emit("collapse_status", data, to=TEAMS_ROOM)
+        
+        
+    def init_collapse(self) -> None:
+        """Schedule the collapse jobs, and apply the collapses already passed. It can be called again safely."""
+        
+        for index, collapse in enumerate(COLLAPSE):
             hour, minute = map(int, collapse["time"].split(":"))
             collapse_time = datetime.now().replace(hour=hour, minute=minute, second=0, microsecond=0)
             
+            self.scheduler.remove(f"collapse_warning:{index}")
+            self.scheduler.remove(f"collapse:{index}")
+            
             if collapse_time < datetime.now():
-                self._collapse()
+                # 已套用過的崩塌不重複套用
+                if self.collapse.status <= index:
+                    self._collapse()
                 
             elif collapse_time - datetime.now() < timedelta(minutes=5):
                 self._collapse_warning()
                 
-                self.collapse_scheduler.add_job(self._collapse, "date", run_date=collapse_time)
-                log.info(f"Add collapse job at {collapse_time}.")
+                self.scheduler.add(f"collapse:{index}", self._collapse, "date", run_date=collapse_time)
             
             else:
-                self.collapse_scheduler.add_job(self._collapse_warning, "date", run_date=collapse_time - timedelta(minutes=5))
-                log.info(f"Add collapse warning job at {collapse_time - timedelta(minutes=5)}.")
-                
-                self.collapse_scheduler.add_job(self._collapse, "date", run_date=collapse_time)
-                log.info(f"Add collapse job at {collapse_time}.")
+                self.scheduler.add(f"collapse_warning:{index}", self._collapse_warning, "date", run_date=collapse_time - timedelta(minutes=5))
+                self.scheduler.add(f"collapse:{index}", self._collapse, "date", run_date=collapse_time)
             
-        self.collapse_scheduler.add_job(self._collapse_damage, "interval", minutes=COLLAPSE_DAMAGE_INTERVAL)
-        self.collapse_scheduler.start()
+        self.scheduler.add("collapse_damage", self._collapse_damage, "interval", minutes=COLLAPSE_DAMAGE_INTERVAL)
         
-        log.info("Collapse scheduler started.")
+        log.info("Collapse jobs scheduled.")
         
         
     def init_prison(self) -> None:
+        """Rebuild the release queue from the imprisoned teams."""
+        
+        self._prison_queue = [(team.imprisoned_time, team.name) for team in self.teams.values() if team.is_imprisoned]
+        heapq.heapify(self._prison_queue)
+        
+        # 沒有隊伍被關押時不排程
+        if self._prison_queue:
+            self._schedule_release()
+        else:
+            self.scheduler.remove("release")
+            
+            
+    def _schedule_release(self) -> None:
+        self.scheduler.add("release", self._release, "date", run_date=datetime.fromtimestamp(self._prison_queue[0][0]))
+        
         
-        if self.prison_scheduler.running:
+    @_locked
+    def imprison(self, name: str, minutes: int) -> None:
+        """
+        Imprison the team. It is released exactly after the time.
+        
+        Parameters
+        ----------
+        name: :type:`str`
+            The name of the team.
+            
+        minutes: :type:`int`
+            The time (minute) of being imprisoned.
+        """
+        
+        team = self.teams[name]
+        team.is_imprisoned = True
+        team.imprisoned_time = int(time.time()) + minutes * 60
+        
+        self._queue_release(name)
+        self.notify_team(name, "is_imprisoned", "imprisoned_time")
+        
+        
+    def _queue_release(self, name: str) -> None:
+        
+        team = self.teams.get(name)
+        
+        if team is None or not team.is_imprisoned:
             return None
+        
+        entry = (team.imprisoned_time, name)
+        heapq.heappush(self._prison_queue, entry)
+        
+        if self._prison_queue[0] == entry:
+            self._schedule_release()
             
-        self.prison_scheduler.add_job(self._release, "interval", minutes=1)
-        self.prison_scheduler.start()
+            
+    def prison_remaining(self, name: str) -> int | None:
+        """
+        Get the remaining time of the imprisonment.
+        
+        Parameters
+        ----------
+        name: :type:`str`
+            The name of the team.
+            
+        Returns
+        -------
+        remaining: :type:`int` | :type:`None`
+            The remaining time in second, or `None` if the team is not imprisoned.
+        """
         
-        log.info("Prison scheduler started.")
+        team = self.teams.get(name)
+        
+        if team is None or not team.is_imprisoned:
+            return None
+        
+        return max(team.imprisoned_time - int(time.time()), 0)
     
     
+    @_locked
+    def release(self, name: str) -> None:
+        """
+        Release the team from prison.
+        
+        Parameters
+        ----------
+        name: :type:`str`
+            The name of the team.
+        """
+        
+        team = self.teams.get(name)
+        
+        if team is None or not team.is_imprisoned:
+            return None
+        
+        team.is_imprisoned = False
+        team.imprisoned_time = 0
+        team.add_event_log(f"Released from prison")
+        
+        self.emit("release", name)
+        self.notify_team(name, "is_imprisoned", "imprisoned_time")
+        
+        log.debug(f"Team {name} released.")
+    
+    
+    @_locked
     def _collapse(self) -> None:
         
         if self.is_running is False:
             log.warning("Game ended.")
             return None
         
+        # 全部崩塌後不再有下一次崩塌
+        if self.collapse.status >= len(COLLAPSE):
+            log.warning("Every collapse has been applied.")
+            return None
+        
         self.collapse.warning = False
         
         collapse = COLLAPSE[self.collapse.status]
                 
         if collapse["final"]:
-            for station in self.metro.graph.keys():
-                if station == END_STATION: continue
-                self.collapse_list.append(station)
+            self.collapse.add(station for station in self.metro.graph.keys() if station != END_STATION)
                 
             self.collapse.status += 1
+            self._notify_collapse()
                 
             log.debug("All stations collapsed.")
             
             return None
         
-        for station in collapse["stations"]:
-            self.collapse_list.append(station)
+        self.collapse.add(collapse["stations"])
             
         if self.collapse.status + 1 < len(COLLAPSE):
             self.collapse.next_time = COLLAPSE[self.collapse.status + 1]["time"]
@@ -133,26 +616,36 @@ class Core:
             self.collapse.next_time = None
         
         self.collapse.status += 1
-        self.socketio.emit("collapse", collapse["stations"])
+        self.emit("collapse", collapse["stations"])
+        self._notify_collapse()
         
         log.info(f"Station collapsed. Current status: {self.collapse.status}.")
                 
                 
+    @_locked
     def _collapse_damage(self) -> None:
         
         if self.is_running is False:
             log.warning("Game ended.")
             return None
         
-        for team in self.teams.values():
-            if team.location in self.collapse_list:
-                log.debug(f"Team {team.name} is in collapsed station {team.location}.")
-                team.point -= COLLAPSE_DAMAGE
-                team.add_point_log(-COLLAPSE_DAMAGE, "Station collapsed")
-                self.socketio.emit("collapse_damage", team.name)
-                log.debug(f"Team {team.name} took collapse damage -{COLLAPSE_DAMAGE}. Current point: {team.point}.")
+        # 一次找出所有在崩塌站點的隊伍
+        hit_teams = [team for team in self.teams.values() if team.location in self.collapse.stations]
+        
+        if not hit_teams:
+            return None
+        
+        for team in hit_teams:
+            team.point -= COLLAPSE_DAMAGE
+            team.add_point_log(-COLLAPSE_DAMAGE, "Station collapsed")
+            self.notify_team(team.name, "point")
+            
+        self.emit("collapse_damage", [team.name for team in hit_teams])
+        
+        log.debug(f"Teams {', '.join(team.name for team in hit_teams)} took collapse damage -{COLLAPSE_DAMAGE}.")
                 
                 
+    @_locked
     def _collapse_warning(self) -> None:
         
         if self.is_running is False:
@@ -161,144 +654,571 @@ class Core:
         
         self.collapse.warning = True
         
-        self.socketio.emit("collapse_warning")
+        self.emit("collapse_warning")
+        self._notify_collapse()
         log.info(f"Station will collapse in 5 minutes.")
         
         
+    @_locked
     def _release(self) -> None:
-        for team in self.teams.values():
+        
+        now = time.time()
+        
+        while self._prison_queue and self._prison_queue[0][0] <= now:
+            release_time, name = heapq.heappop(self._prison_queue)
+            team = self.teams.get(name)
             
-            if not team.is_imprisoned:
+            # 已被提前釋放或重新關押的舊紀錄
+            if team is None or not team.is_imprisoned or team.imprisoned_time != release_time:
                 continue
             
-            team.imprisoned_time -= 1
-            if team.imprisoned_time <= 0:
+            self.release(name)
+            
+        if self._prison_queue:
+            self._schedule_release()
+            
+            
+    def init_backup(self) -> None:
+        """Schedule the auto backup."""
+        
+        self.scheduler.add("backup", self._auto_backup, "interval", minutes=BACKUP_INTERVAL)
+
                 
-                team.is_imprisoned = False
-                team.imprisoned_time = 0
+    def _auto_backup(self) -> None:
+        
+        if self.app is None or not self.is_running:
+            return None
+        
+        self.backup()
                 
-                log.debug(f"Team {team.name} released.")
-                core.teams[team.name].add_event_log(f"Released from prison")
-                self.socketio.emit("release", team.name)
                 
-    def init_backup(self) -> None:
-        """Initialize the backup scheduler."""
+    @_locked
+    def start_game(self, stations: list[Mapping] | None=None) -> None:
+        """
+        Start the game. The special and hidden stations are random, \
+        they are recorded with the start, so the journal and the other workers replay the same game.
+        
+        Parameters
+        ----------
+        stations: :type:`list[Mapping]`
+            The rows of :meth:`MetroSystem.snapshot_stations` to start the recorded game, random if not given.
+        """
         
-        if self.backup_scheduler.running:
+        if self.is_running:
+            log.warning("Game already started.")
             return None
         
-        self.backup_scheduler.add_job(lambda: requests.get(f"http://localhost:8080/api/admin/save_game_auto?secret={self.auto_backup_secret}"), "interval", minutes=BACKUP_INTERVAL)
-        self.backup_scheduler.start()
+        self.metro = MetroSystem()
+        
+        if stations is not None:
+            self.metro.restore_stations(stations)
         
-        log.info("Backup scheduler started.")
+        self.collapse = Collapse()
+        
+        for team in self.teams.values():
+            self.reset_team(team.name)
+            
+        # if "admins" not in self.teams.keys():
+        #     self.create_team("admins", admins=ADMINS.copy())
+            
+        self.is_running = True
+        
+        # 重置崩塌狀態後才排程，已過的崩塌會立即套用
+        self.init_collapse()
+        self.init_prison()
+        self.init_backup()
+        
+        self._record_start()
+        
+        # 立即備份，journal中上一場遊戲的紀錄不需再重播
+        if self._publishing and self._applying.get() is None and has_app_context():
+            try:
+                self.backup()
+            except Exception:
+                log.exception("Failed to backup the new game, the journal is kept.")
+        
+        log.info("Game started.")
+                
+            
+    def _record_start(self) -> int:
+        
+        return self._record({"type": "start", "stations": [dict(row) for row in self.metro.snapshot_stations().values()]})
+    
+    
+    @_locked
+    def end_game(self) -> None:
+        """End the game."""
+        
+        if not self.is_running:
+            log.warning("Game already ended.")
+            return None
+        
+        self.is_running = False
+        self._record({"type": "end"})
+        
+        log.info("Game ended.")
+        
+    
+    @_locked
+    def load_team(self) -> None:
+        """Load the data from the database."""
+        
+        logs = load_team_logs()
+        
+        for team in Teams.query.all():
+
+            team: Teams
+
+            if team.name in self.teams:
+                self.teams[team.name].replace_data(team)
+                log.info(f"Loaded team {team.name} from database.")
+            else:
+                self.create_team(team.name, team.players, team.admins, team.location)
+                self.teams[team.name].replace_data(team)
 
+                log.info(f"Created team {team.name} from database.")
+                
+            for field in LOG_TABLES.keys():
+                setattr(self.teams[team.name], field, logs.get(team.name, {}).get(field, []))
                 
-    def start_game(self) -> None:
-        """Start the game."""
+            self._saved_logs[team.name] = {field: (getattr(self.teams[team.name], field), len(getattr(self.teams[team.name], field))) for field in LOG_TABLES.keys()}
+            self._saved_teams[team.name] = copy.deepcopy(self.teams[team.name].to_dict(TEAM_ROW_FIELDS))
+            self._count_combo_progress(team.name)
+            
+            # 舊版每分鐘遞減剩餘的分鐘數，轉換為出獄時間，下次備份時寫回
+            restored = self.teams[team.name]
+            if restored.is_imprisoned and 0 < restored.imprisoned_time < LEGACY_IMPRISONED_TIME_LIMIT:
+                restored.imprisoned_time = int(time.time()) + restored.imprisoned_time * 60
+
+        self._rebuild_members()
+        self.init_prison()
+        self._mark_sync(self._record({"type": "restore"}))
+            
+        log.debug("Load data from the database.")
+            
         
-        if self.is_running:
-            log.warning("Game already started.")
+    def snapshot(self) -> GameSnapshot:
+        """
+        Take a read-only snapshot of the game state. \\
+        Only the teams changed since the last snapshot (by the state version of :meth:`notify_team`) are copied. \\
+        It doesn't wait for the state lock, the copy is taken again if a change is made while copying, \\
+        so no change is half done in the snapshot. \\
+        If other threads keep changing the state, the last complete snapshot is returned.
+        
+        Returns
+        -------
+        snapshot: :class:`GameSnapshot`
+            The snapshot of the game state.
+        """
+        
+        for _ in range(SNAPSHOT_RETRIES):
+            seq = self._seq
+            
+            if seq % 2 == 1:
+                # 讓出執行權給進行中的變動
+                time.sleep(0)
+                continue
+            
+            try:
+                snapshot, copied = self._snapshot()
+            except (RuntimeError, KeyError, IndexError):
+                # 複製時被變動改了容器大小
+                continue
+            
+            if seq == self._seq:
+                return self._keep_snapshot(snapshot, copied)
+            
+        # 由變動中的執行緒取得快照，或鎖剛好空閒
+        if self._lock.acquire(blocking=False):
+            try:
+                return self._keep_snapshot(*self._snapshot())
+            finally:
+                self._lock.release()
+                
+        # 其他變動持續進行時使用上一份完整的快照，不等待
+        if self._last_snapshot is not None:
+            return self._last_snapshot
+        
+        with self._lock:
+            return self._keep_snapshot(*self._snapshot())
+        
+        
+    def _keep_snapshot(self, snapshot: GameSnapshot, copied: dict[str, tuple[int, Mapping[str, Any]]]) -> GameSnapshot:
+        
+        self._snapshot_cache.update(copied)
+        self._last_snapshot = snapshot
+        
+        return snapshot
+        
+        
+    def _snapshot(self) -> tuple[GameSnapshot, dict[str, tuple[int, Mapping[str, Any]]]]:
+        
+        version = self.version
+        teams, logs = {}, {}
+        copied = {} # 確認沒有讀到一半的變動後才放進快取
+        
+        for name, team in list(self.teams.items()):
+            cached = self._snapshot_cache.get(name)
+            
+            team_version = self._team_version(name)
+            
+            if cached is None or cached[0] != team_version:
+                cached = (team_version, MappingProxyType(copy.deepcopy(team.to_dict(TEAM_ROW_FIELDS))))
+                copied[name] = cached
+                
+            teams[name] = cached[1]
+            logs[name] = MappingProxyType({field: (getattr(team, field), len(getattr(team, field))) for field in LOG_TABLES.keys()})
+            
+        for name in self._snapshot_cache.keys() - teams.keys():
+            self._snapshot_cache.pop(name, None)
+            
+        collapse = {
+            "status": self.collapse.status,
+            "warning": self.collapse.warning,
+            "next_time": self.collapse.next_time,
+            "stations": frozenset(self.collapse.stations),
+        }
+        
+        return GameSnapshot(version, teams, logs, self.metro.snapshot_stations(), collapse), copied
+    
+    
+    def _team_version(self, name: str) -> int:
+        
+        marks = self._log_marks.get(name)
+        
+        return marks[-1][0] if marks else self.sync_version
+    
+    
+    def save_team(self, snapshot: GameSnapshot | None=None) -> int:
+        """
+        Save the changed teams to the database since the last save, without committing. \\
+        The list attributes in `LOG_TABLES` are append-only, only the new entries are inserted. \\
+        Use :meth:`backup` to save everything in one transaction.
+        
+        Parameters
+        ----------
+        snapshot: :class:`GameSnapshot`
+            The snapshot to save. If not given, take a new one.
+        
+        Returns
+        -------
+        count: :type:`int`
+            The number of written teams and log entries.
+        """
+        
+        if snapshot is None:
+            snapshot = self.snapshot()
+        
+        rows = []
+        count = 0
+        
+        for name, row in snapshot.teams.items():
+            if name == "admins":
+                continue
+            
+            # 與上次儲存的內容比較，只寫入有變動的隊伍
+            if row != self._saved_teams.get(name):
+                rows.append(dict(row))
+                
+            count += self._save_logs(name, snapshot.logs[name])
+            
+        bulk_upsert(Teams, rows)
+        
+        self._saved_teams.update({row["name"]: row for row in rows})
+        
+        log.debug(f"Saved {len(rows)} changed teams.")
+        
+        return count + len(rows)
+        
+        
+    def _save_logs(self, name: str, logs: Mapping[str, tuple[list, int]]) -> int:
+        
+        saved = self._saved_logs.setdefault(name, {})
+        inserted = 0
+        
+        for field, (model, extra) in LOG_TABLES.items():
+            entries, length = logs[field]
+            saved_entries, count = saved.get(field, (None, 0))
+            
+            # 清單被替換 (重置、還原或尚未儲存過) 時重寫整份紀錄，否則只寫入新增的部分
+            if saved_entries is not entries or length < count:
+                model.query.filter_by(team=name, **extra).delete()
+                count = 0
+                
+            if length > count:
+                db.session.execute(db.insert(model), [
+                    {"team": name, "seq": seq, **extra, **model.mapping(entry)}
+                    for seq, entry in enumerate(entries[count:length], count)
+                ])
+                inserted += length - count
+                
+            saved[field] = (entries, length)
+            
+        return inserted
+
+    
+    @_locked
+    def create_team(self, name: str, players: list[str]=None, admins: list[str]=None, station: str=None) -> None:
+        """
+        Create a new team.
+        
+        Parameters
+        ----------
+        name: :type:`str`
+            The name of the team.
+            
+        station: :type:`str`
+            The name of the station.
+            
+        players: :type:`list[str]`
+            The list of player discord usernames.
+            
+        Returns
+        -------
+        team: :class:`Team`
+            The team object.
+        """
+        
+        if name in self.teams.keys():
+            log.warning(f"Team {name} already exists.")
+            return None
+        
+        if station == "":
+            station = None
+
+        self.teams[name] = Team(name, list(players) if players is not None else [], list(admins) if admins is not None else [], station)
+        self._index_team(self.teams[name])
+        self._sync_rooms(*(*self.teams[name].admins, *self.teams[name].players))
+        self._count_combo_progress(name)
+        self._mark_sync(self._record({"type": "create", "name": name, "players": players, "admins": admins, "station": station}))
+        
+        log.debug(f"Team {name} created.")
+        
+        
+    @_locked
+    def delete_team(self, name: str) -> Team | None:
+        """
+        Delete the team.
+        
+        Parameters
+        ----------
+        name: :type:`str`
+            The name of the team.
+            
+        Returns
+        -------
+        team: :class:`Team`
+            The deleted team object, or `None` if the team does not exist.
+        """
+        
+        team = self.teams.pop(name, None)
+        
+        if team is None:
+            log.warning(f"Team {name} does not exist.")
+            return None
+        
+        self._rebuild_members()
+        self.combo_progress.pop(name, None)
+        self._mark_sync(self._record({"type": "delete", "name": name}))
+        
+        log.debug(f"Team {name} deleted.")
+        
+        return team
+    
+    
+    @_locked
+    def join_team(self, name: str, player: str, admin: bool=False) -> None:
+        """
+        Let the player join the team, and leave the current team if the player has one. \
+        An admin keeps the current team, so an admin can be in many teams.
+        
+        Parameters
+        ----------
+        name: :type:`str`
+            The name of the team.
+            
+        player: :type:`str`
+            The discord username of the player.
+            
+        admin: :type:`bool`
+            Join as an admin of the team.
+        """
+        
+        if name not in self.teams.keys():
+            log.warning(f"Team {name} does not exist.")
             return None
         
-        self.metro = MetroSystem()
+        if admin:
+            self.teams[name].admins.append(player)
+            
+            # 仍以先加入的隊伍為準
+            self._rebuild_members()
+        else:
+            self.leave_team(player)
+            self.teams[name].players.append(player)
+            self.members[player] = (name, admin)
+            
+        self._discard_unknown_player(player)
+        self._sync_rooms(player)
+        
+        self.notify_team(name, "players", "admins")
+        
+        log.debug(f"Player {player} joined team {name}.")
+        
+        
+    @_locked
+    def leave_team(self, player: str) -> bool:
+        """
+        Let the player leave the current team.
+        
+        Parameters
+        ----------
+        player: :type:`str`
+            The discord username of the player.
+            
+        Returns
+        -------
+        result: :type:`bool`
+            If the player was in a team.
+        """
         
-        self.init_collapse()
-        self.init_prison()
-        self.init_backup()
+        member = self.members.pop(player, None)
         
-        self.collapse = Collapse()
-        self.collapse_list = COLLAPSE_LIST.copy()
+        if member is None:
+            return False
         
-        for team in self.teams.values():
-            self.reset_team(team.name)
+        name, admin = member
+        team = self.teams[name]
+        
+        if admin:
+            team.admins.remove(player)
+        else:
+            team.players.remove(player)
             
-        # if "admins" not in self.teams.keys():
-        #     self.create_team("admins", admins=ADMINS.copy())
+        # 同一玩家可能同時在多個預設隊伍，離開後重新找出下一個隊伍
+        if any(player in t.admins or player in t.players for t in self.teams.values()):
+            self._rebuild_members()
             
-        self.is_running = True
+        self._sync_rooms(player)
+        self.notify_team(name, "players", "admins")
+            
+        log.debug(f"Player {player} left team {name}.")
+            
+        return True
+    
+    
+    def _index_team(self, team: Team) -> None:
         
-        log.info("Game started.")
-                
+        # 已在其他隊伍的玩家以先加入的隊伍為準 (與逐隊檢查的順序相同)
+        for admin in team.admins:
+            self.members.setdefault(admin, (team.name, True))
             
-    def end_game(self) -> None:
-        """End the game."""
+        for player in team.players:
+            self.members.setdefault(player, (team.name, False))
+            
+        for player in (*team.admins, *team.players):
+            self._discard_unknown_player(player)
         
-        if not self.is_running:
-            log.warning("Game already ended.")
-            return None
         
-        self.is_running = False
+    def _discard_unknown_player(self, player: str) -> None:
         
-        log.info("Game ended.")
+        if player in self.unknown_players:
+            self.unknown_players.discard(player)
+            self.emit("unknown_players", list(self.unknown_players), to=ADMINS_ROOM)
         
-    
-    def load_team(self) -> None:
-        """Load the data from the database."""
         
-        for team in Teams.query.all():
-
-            team: Teams
-
-            if team.name in self.teams:
-                self.teams[team.name].replace_data(team)
-                log.info(f"Loaded team {team.name} from database.")
-            else:
-                self.create_team(team.name, team.players, team.admins, team.location)
-                self.teams[team.name].replace_data(team)
-
-                log.info(f"Created team {team.name} from database.")
-
-            
-        log.debug("Load data from the database.")
-            
+    def _rebuild_members(self) -> None:
         
-    def save_team(self) -> None:
-        """Save the data to the database."""
+        self.members = {}
         
         for team in self.teams.values():
-            if team.name == "admins":
-                continue
-            if Teams.query.filter_by(name=team.name).first() is None:
-                db.session.add(Teams(team))
-            else:
-                Teams.query.filter_by(name=team.name).update({**team.__dict__})
-                
-        db.session.commit()
+            self._index_team(team)
+            
+        self._sync_rooms(*self._sessions.keys())
         
-        log.debug("Save data to the database.")
-
-    
-    def create_team(self, name: str, players: list[str]=None, admins: list[str]=None, station: str=None) -> None:
+        
+    def connect_player(self, player: str, sid: str) -> None:
         """
-        Create a new team.
+        Put the socketio connection of the player in the rooms of the player. \\
+        The rooms are changed with the team of the player, see :meth:`player_rooms`.
         
         Parameters
         ----------
-        name: :type:`str`
-            The name of the team.
+        player: :type:`str`
+            The discord username of the player.
             
-        station: :type:`str`
-            The name of the station.
+        sid: :type:`str`
+            The session id of the socketio connection.
+        """
+        
+        with self._lock:
+            self._sessions.setdefault(player, set()).add(sid)
+            self._sync_rooms(player)
             
-        players: :type:`list[str]`
-            The list of player discord usernames.
+            
+    def disconnect_player(self, sid: str) -> None:
+        """Forget the socketio connection, socketio removes it from its rooms."""
+        
+        with self._lock:
+            self._session_rooms.pop(sid, None)
+            
+            for player, sids in list(self._sessions.items()):
+                sids.discard(sid)
+                if not sids:
+                    del self._sessions[player]
+                    
+                    
+    def player_rooms(self, player: str) -> set[str]:
+        """
+        Get the socketio rooms of the player.
+        
+        Parameters
+        ----------
+        player: :type:`str`
+            The discord username of the player.
             
         Returns
         -------
-        team: :class:`Team`
-            The team object.
+        rooms: :type:`set[str]`
+            `TEAMS_ROOM` for every player, the room of the team of the player, \\
+            and `ADMINS_ROOM` for the admins.
         """
         
-        if name in self.teams.keys():
-            log.warning(f"Team {name} already exists.")
-            return None
+        member = self.members.get(player)
+        admin = player in ADMINS or (member is not None and member[1])
+        rooms = set()
         
-        if station == "":
-            station = None
-
-        self.teams[name] = Team(name, players if players is not None else [], admins if admins is not None else [], station)
+        if member is not None or admin:
+            rooms.add(TEAMS_ROOM)
+            
+        # 自己隊伍的完整變動只推送到隊伍的房間
+        if member is not None:
+            rooms.add(team_room(member[0]))
+            
+        if admin:
+            rooms.add(ADMINS_ROOM)
+            
+        return rooms
+    
+    
+    def _sync_rooms(self, *players: str) -> None:
         
-        log.debug(f"Team {name} created.")
+        # 房間只存在於本worker的連線，套用其他worker的紀錄時也要更新
+        if self.socketio is None:
+            return None
+        
+        for player in players:
+            rooms = self.player_rooms(player)
+            
+            for sid in self._sessions.get(player, ()):
+                current = self._session_rooms.get(sid, set())
+                
+                for room in current - rooms:
+                    self.socketio.server.leave_room(sid, room, namespace="/")
+                for room in rooms - current:
+                    self.socketio.server.enter_room(sid, room, namespace="/")
+                    
+                self._session_rooms[sid] = rooms
         
         
     def check_player(self, player: str) -> tuple[Team | None, bool]:
@@ -319,21 +1239,79 @@ class Core:
             If the player is an admin.
         """
         
-        for team in self.teams:
-            
-            if player in self.teams[team].admins:
-                return self.teams[team], True
-            
-            if player in self.teams[team].players:
-                return self.teams[team], player in ADMINS
+        member = self.members.get(player)
+        
+        if member is not None:
+            name, admin = member
+            return self.teams[name], admin or (player in ADMINS)
             
         if player not in self.unknown_players:
-            self.unknown_players.append(player)
+            self.unknown_players.add(player)
+            self.emit("unknown_players", list(self.unknown_players), to=ADMINS_ROOM)
             
         return None, player in ADMINS
     
     
-    def check_combo(self, name: str) -> None:
+    @_locked
+    def load_combos(self) -> None:
+        """Load the combos and index them by station."""
+        
+        self.combos = load_data("combo")
+        self.combo_index = {}
+        
+        for combo in self.combos:
+            for station in set(combo["stations"]):
+                self.combo_index.setdefault(station, []).append(combo)
+                
+        for name in self.teams:
+            self._count_combo_progress(name)
+            
+        log.debug(f"Loaded {len(self.combos)} combos.")
+        
+        
+    def _sync_combos(self) -> None:
+        
+        # combo.json被修改時重新建立索引
+        if load_data("combo") is not self.combos:
+            self.load_combos()
+            
+            
+    def _count_combo_progress(self, name: str) -> None:
+        
+        stations = set(self.teams[name].stations)
+        self.combo_progress[name] = {combo["name"]: len(stations.intersection(combo["stations"])) for combo in self.combos}
+        
+        
+    @_locked
+    def visit_station(self, name: str, station: str) -> None:
+        """
+        Record the station visited by the team and check the combos including it.
+        
+        Parameters
+        ----------
+        name: :type:`str`
+            The name of the team.
+            
+        station: :type:`str`
+            The name of the station.
+        """
+        
+        if station in self.teams[name].stations:
+            return None
+        
+        self._sync_combos()
+        
+        self.teams[name].stations.append(station)
+        
+        progress = self.combo_progress[name]
+        for combo in self.combo_index.get(station, []):
+            progress[combo["name"]] += 1
+            
+        self.check_combo(name, station)
+    
+    
+    @_locked
+    def check_combo(self, name: str, station: str | None=None) -> None:
         """
         Check if the team achieved the combo and add the point.
         
@@ -341,45 +1319,30 @@ class Core:
         ----------
         name: :type:`str`
             The name of the team.
+            
+        station: :type:`str`
+            Only check the combos including the station. If not given, check all combos.
         """
         
-        for combo in load_data("combo"):
+        self._sync_combos()
+        
+        progress = self.combo_progress[name]
+        
+        for combo in (self.combos if station is None else self.combo_index.get(station, [])):
             if combo["name"] in self.teams[name].combos:
                 continue
             
-            if set(combo["stations"]) == set(combo["stations"]).intersection(set(self.teams[name].stations)):
+            if progress[combo["name"]] == len(set(combo["stations"])):
                 self.teams[name].point += combo["point"]
                 self.teams[name].combos.append(combo["name"])
                 self.teams[name].add_point_log(combo["point"], f"Achieved combo {combo['name']}")
                 core.teams[name].add_event_log(f"Achieved combo {combo['name']}")
                 
-                self.socketio.emit("combo", combo["name"])
+                self.emit("combo", combo["name"])
                 
                 log.debug(f"Team {name} achieved combo {combo['name']}.")
     
     
-    # DFS🔥🔥🔥
-    def _move(self, current_station: str, target_deep: int, deep: int=1) -> list[str]:
-        choice = []
-        
-        if deep > target_deep or current_station in self.visited:
-            return choice
-        
-        self.visited.append(current_station)
-        
-        for station in self.metro.move(current_station):
-            if station not in self.visited: choice.append(station)
-            choice.extend(self._move(station, target_deep, deep + 1))
-            
-        log.debug(f"Deep: {deep}, Station: {current_station}, Choice: {choice}")
-        
-        for s in choice:
-            if s not in self.choice[deep]:
-                self.choice[deep].append(s)
-                
-        return choice
-    
-    
     def move(self, name: str, step: int) -> list[str] | None:
         """
         Calculate the possible stations to move.
@@ -402,22 +1365,29 @@ class Core:
             log.warning("Game ended.")
             return None
 
-        if name not in self.teams.keys():
+        team = self.teams.get(name)
+        
+        if team is None:
             log.warning(f"Team {name} does not exist.")
             return None
         
-        self.choice = {i: [] for i in range(1, 7)}
-        self.visited = []
-        current_station = self.teams[name].location
-        self._move(current_station, step)
-                    
-        self.teams[name].choice = self.choice[step]
+        # 移動計算只讀唯讀的graph快照，只在設定選項時持有狀態鎖
+        choice = self.metro.reachable_stations(team.location, step)
         
-        log.debug(f"Team {name} can move to {self.choice[step]}.")
+        with self.lock():
+            if self.teams.get(name) is not team:
+                log.warning(f"Team {name} does not exist.")
+                return None
+            
+            team.choice = choice
+            self.notify_team(name, "choice")
+        
+        log.debug(f"Team {name} can move to {choice}.")
         
-        return self.choice[step]
+        return choice
     
     
+    @_locked
     def move_to_location(self, name: str, location: str) -> None:
         """
         Set the target location of the team to move.
@@ -476,8 +1446,12 @@ class Core:
         log.debug(f"The target location of team {name} is {location}.")
         self.teams[name].add_event_log(f"Going to {self.teams[name].target_location}")
         
+        self.notify_team(name, "target_location", "current_card")
+        self.notify_station(station.name)
+        
         return None
 
+    @_locked
     def arrive_target(self, name: str) -> None:
         """
         Confirm if the team arrive.
@@ -503,10 +1477,6 @@ class Core:
         self.teams[name].location = self.teams[name].target_location
         station = self.metro.find_station(self.teams[name].location)
         
-
-        # 達成組合
-        self.check_combo(name)
-        
         # 過路費
         if station.team is not None and station.team != name:
             self.teams[name].point -= station.point
@@ -515,12 +1485,15 @@ class Core:
             self.teams[station.team].point += station.point
             self.teams[station.team].add_point_log(station.point, f"From team {name}")
             
+            self.notify_team(station.team, "point")
+            
         # 監獄
         if station.is_prison:
-            self.teams[name].is_imprisoned = True
-            self.teams[name].imprisoned_time = random.randint(IMPRISONED_TIME["min"], IMPRISONED_TIME["max"])
+            self.imprison(name, random.randint(IMPRISONED_TIME["min"], IMPRISONED_TIME["max"]))
             self.teams[name].current_mission_finished = True
-            self.teams[name].stations.append(station.name)
+            
+            # 紀錄經過站點並達成組合
+            self.visit_station(name, station.name)
 
             core.teams[name].add_event_log(f"Imprisoned at {station.name}")
             log.debug(f"Team {name} is imprisoned.") 
@@ -529,6 +1502,7 @@ class Core:
             self.teams[name].current_mission_finished = True
             log.debug(f"team {name} arrived at {self.teams[name].location} again.")
             self.teams[name].add_event_log(f"Arrived at {self.teams[name].location} again")
+            self.notify_team(name, "location", "point", "current_mission_finished")
             return None
 
         else:
@@ -540,8 +1514,11 @@ class Core:
         log.debug(f"team {name} arrived at {self.teams[name].location}.")
         self.teams[name].add_event_log(f"Arrived at {self.teams[name].location}")
         
+        self.notify_team(name, "location", "point", "current_mission_finished", "stations", "combos")
+        
         return None 
         
+    @_locked
     def finish_mission(self, name: str) -> str | None:
         """
         Finish the mission.
@@ -596,12 +1573,8 @@ class Core:
                 self.teams[name].owned_stations.append(station.name)
                 self.teams[name].add_event_log(f"Owned station {station.name}")
             
-        # 紀錄經過站點
-        if station.name not in self.teams[name].stations:
-            self.teams[name].stations.append(station.name)
-
-        # 達成組合
-        self.check_combo(name)
+        # 紀錄經過站點並達成組合
+        self.visit_station(name, station.name)
 
         # 初始化
         self.teams[name].current_mission_finished = True
@@ -618,9 +1591,14 @@ class Core:
             core.teams[name].add_event_log(f"Drew card \'{self.teams[name].current_card}\'")
             log.debug(f"Team {name} draw card {self.teams[name].current_card}.")    
             
+        self.notify_team(name, "point", "owned_stations", "stations", "combos", "current_mission_finished", "location", "current_card")
+        self.notify_station(station.name)
+        
+        if station.is_special:
             return self.teams[name].current_card
         
         
+    @_locked
     def skip_mission(self, name: str) -> None:
         """
         Skip the mission.
@@ -659,9 +1637,11 @@ class Core:
         
         log.debug(f"Team {name} skipped the mission.")
         core.teams[name].add_event_log(f"Skipped the mission")
+        
+        self.notify_team(name, "current_mission_finished", "location")
             
         
-    def dice(self, faces: int=6) -> int:
+    def dice(self, faces: int=DICE_FACES) -> int:
         """
         Just a dice.
         
@@ -679,7 +1659,7 @@ class Core:
         return random.randint(1, faces)
     
     
-    def check_pos(self, name: str, geohash: str) -> dict | None:
+    def check_pos(self, name: str, latitude: float, longitude: float) -> dict | None:
         """
         Check the position of the team.
         
@@ -688,8 +1668,11 @@ class Core:
         name: :type:`str`
             The name of the team.
             
-        geohash: :type:`str`
-            The geohash of the position.
+        latitude: :type:`float`
+            The latitude of the position.
+            
+        longitude: :type:`float`
+            The longitude of the position.
             
         Returns
         -------
@@ -699,8 +1682,8 @@ class Core:
             - location: :type:`str`
                 The current station of the team.
                 
-            - distance: :type:`str`
-                The distance between the station and the position.
+            - distance: :type:`float`
+                The distance (meter) between the target station and the position.
         """
         
         if self.is_running is False:
@@ -714,29 +1697,55 @@ class Core:
         if self.teams[name].is_imprisoned:
             return None
         
+        # 查詢最近的車站不需要鎖，只在更新位置時持有狀態鎖
+        station_name, _ = self.metro.station_index.nearest(latitude, longitude)
+        
         data = {
-            "location": None,
-            "distance": None,
+            "location": station_name,
+            "distance": self.metro.station_index.distance(self.teams[name].target_location, latitude, longitude),
         }
         
-        for station_name, station_geohash in self.metro.station_location.items():
-            dis = pgh.geohash_approximate_distance(geohash, station_geohash)
-            if dis <= DISTANCE:
+        if station_name is not None and station_name != self.teams[name].location:
+            with self.lock():
+                team = self.teams.get(name)
                 
-                if data["location"] is None or dis < data["distance"]:
-                    data["location"] = station_name
-                    self.teams[name].location = station_name
-                    
+                if team is not None and not team.is_imprisoned and station_name != team.location:
+                    team.location = station_name
+                    self.notify_team(name, "location")
                     log.info(f"Team {name} moved to {station_name}.")
-                    
-            if station_name == self.teams[name].target_location:
-                data["distance"] = dis
                 
         log.debug(data)
         
         return data
     
     
+    def check_positions(self, readings: list[tuple[str, float, float, float | None]]) -> dict[str, dict | None]:
+        """
+        Check the positions of many teams in one pass. \\
+        If a team has more than one reading, only the newest one is used.
+        
+        Parameters
+        ----------
+        readings: :type:`list[tuple[str, float, float, float | None]]`
+            The readings of `(team name, latitude, longitude, timestamp)`.
+            
+        Returns
+        -------
+        data: :type:`dict[str, dict | None]`
+            The result of :meth:`check_pos` of every team.
+        """
+        
+        latest: dict[str, tuple[float, float, float | None]] = {}
+        
+        for name, latitude, longitude, ts in readings:
+            if name in latest and ts is not None and latest[name][2] is not None and ts < latest[name][2]:
+                continue
+            latest[name] = (latitude, longitude, ts)
+            
+        return {name: self.check_pos(name, latitude, longitude) for name, (latitude, longitude, _) in latest.items()}
+    
+    
+    @_locked
     def reset_team(self, name: str) -> None:
         """
         Reset the team.
@@ -760,27 +1769,262 @@ class Core:
         self.teams[name].is_imprisoned = False
         self.teams[name].stations = []
         self.teams[name].combos = []
+        self._count_combo_progress(name)
         self.teams[name].choice = []
         self.teams[name].point_log = []
         
+        self.notify_team(name, "point", "step", "target_location", "current_mission_finished", "current_card",
+                         "imprisoned_time", "is_imprisoned", "stations", "combos", "choice")
+        
         log.info(f"Team {name} reset.")
 
 
     def backup(self) -> None:
-        """Backup the data to the database."""
+        """Backup the changed data to the database in one transaction, and record the `backup_metrics`."""
         
-        self.save_team()
-        self.metro.save_stations()        
+        start = time.perf_counter()
         
-        log.info("Backup data to the database.")
+        try:
+            # 先取得快照，之後的寫入不會讀到進行中的變動
+            snapshot = self.snapshot()
+            rows = self.save_team(snapshot) + self.metro.save_stations(snapshot.stations)
+            # 版本號與資料一起寫入，journal未清除時重播也不會重複套用
+            save_backup_version(snapshot.version)
+            db.session.commit()
+            
+            # 已寫入資料庫的變動不需再保留在journal及共享的紀錄
+            self.backend.set_backup_version(snapshot.version)
+            self.backend.trim(snapshot.version)
+            if not self.backend.shared:
+                self.journal.compact(snapshot.version)
+        except Exception as e:
+            db.session.rollback()
+            
+            # 無法確定哪些資料已寫入，下次備份時全部重寫
+            self._saved_teams.clear()
+            self._saved_logs.clear()
+            self.metro.invalidate_saved()
+            
+            self.backup_metrics["failures"] += 1
+            self.backup_metrics["last_error"] = repr(e)
+            raise
+        
+        self.backup_metrics.update({
+            "count": self.backup_metrics["count"] + 1,
+            "last_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "last_duration": time.perf_counter() - start,
+            "last_rows": rows,
+            "total_rows": self.backup_metrics["total_rows"] + rows,
+            "last_error": None,
+        })
+        
+        log.info(f"Backup {rows} rows to the database in {self.backup_metrics['last_duration']:.3f}s.")
 
+    @_locked
     def restore(self) -> None:
-        """Restore the data from the database."""
+        """Restore the data from the database, the changes after the backup in the journal are dropped."""
         
         self.load_team()
         self.metro.load_stations()
         
+        if not self.backend.shared:
+            self.journal.compact(self.version)
+        
         log.info("Restore data from the database.")
+        
+        
+    def recover(self) -> None:
+        """
+        Restore the last backup and replay the changes after it if the server stopped with unsaved changes, \\
+        then start recording the changes and running the scheduled jobs. Must be called in an app context.
+        
+        The changes are replayed from the shared backend if other workers are running, otherwise from the journal. \\
+        Only the changes newer than the version saved with the backup are replayed. \\
+        The first worker of a new shared game publishes its start, the other workers replay the same game.
+        """
+        
+        # 逐一啟動worker，後啟動的worker才看得到先啟動的worker發布的開局
+        if self.backend.shared and not self.backend.wait_lock("state", STATE_LOCK_TTL, STATE_LOCK_TIMEOUT):
+            raise TimeoutError("Timed out waiting for the state lock held by another worker.")
+        
+        try:
+            self._recover()
+        finally:
+            if self.backend.shared:
+                self.backend.release_lock("state")
+                
+        self.scheduler.start()
+        
+        
+    def _recover(self) -> None:
+        
+        backup_version = load_backup_version()
+        
+        if self.backend.shared:
+            records = self.backend.fetch()
+            
+            if backup_version is None:
+                backup_version = self.backend.get_backup_version()
+        else:
+            records = self.journal.read()
+            
+        # 一律先還原上次的備份，避免沒有紀錄時以預設遊戲的資料覆蓋資料庫
+        if backup_version is not None or Teams.query.first() is not None:
+            self._apply({"type": "restore", "version": backup_version if backup_version is not None else self.version})
+            
+        # 從未備份過則在預設隊伍上重播全部紀錄
+        if backup_version is not None:
+            records = [record for record in records if record["version"] > backup_version]
+                
+        self.replay(records)
+        
+        self._publishing = True
+        
+        # 沒有備份也沒有開局紀錄時，由第一個worker發布自己隨機產生的開局
+        if self.backend.shared and backup_version is None and not any(record["type"] == "start" for record in records):
+            self._record_start()
+            
+        self._mark_sync(self._record({"type": "sync"}))
+        
+        if not self.backend.shared:
+            if records:
+                self.backup()
+            self.journal.open()
+            
+        if records:
+            log.info(f"Recovered {len(records)} change records.")
+            
+            
+    def sync_backend(self) -> None:
+        """Apply the changes of the other workers. Called before every request and scheduled job."""
+        
+        if not self.backend.shared or not self._publishing:
+            return None
+        
+        stale = False
+        
+        # 只讀取其他worker的變動，不需要共享的狀態鎖
+        with self._write():
+            for record in self.backend.fetch():
+                # 比本地變動舊的紀錄無法只傳送變動
+                stale = stale or record["version"] < self.version
+                self._apply(record)
+                
+            if stale:
+                self._mark_sync(self._record({"type": "sync"}))
+        
+        
+    def replay(self, records: list[dict[str, Any]]) -> None:
+        """
+        Apply the change records to the game state in order.
+        
+        Parameters
+        ----------
+        records: :type:`list[dict[str, Any]]`
+            The records of :class:`Journal` or the shared backend.
+        """
+        
+        with self._write():
+            for record in records:
+                self._apply(record, force=True)
+            
+            
+    def _apply(self, record: dict[str, Any], force: bool=False) -> None:
+        """
+        Apply a change record without recording or emitting it again.
+        
+        Parameters
+        ----------
+        record: :type:`dict[str, Any]`
+            The record with `type` and `version`.
+            
+        force: :type:`bool`
+            Apply every field even if this worker changed it in a newer version. \\
+            Otherwise the newer change wins.
+        """
+        
+        version = record["version"]
+        record_type = record["type"]
+        token = self._applying.set(version)
+        
+        try:
+            if record_type == "create":
+                if record["name"] not in self.teams:
+                    self.create_team(record["name"], record["players"], record["admins"], record["station"])
+                    
+            elif record_type == "delete":
+                if record["name"] in self.teams:
+                    self.delete_team(record["name"])
+                    
+            elif record_type == "restore":
+                self.load_team()
+                self.metro.load_stations()
+                
+            elif record_type == "start":
+                # 重新開始同一場遊戲
+                self.is_running = False
+                self.start_game(record["stations"])
+                
+            elif record_type == "end":
+                self.end_game()
+                
+            elif record_type == "team":
+                self._apply_team(record, force)
+                        
+            elif record_type == "station":
+                station = self.metro.find_station(record["name"])
+                if station is not None:
+                    station.team = record["team"]
+                    station.hidden = record["hidden"]
+                    self.metro.invalidate_stations()
+                    
+            elif record_type == "collapse":
+                self.collapse.status = record["status"]
+                self.collapse.warning = record["warning"]
+                self.collapse.next_time = record["next_time"]
+                self.collapse.stations = set(record["stations"])
+        finally:
+            self._applying.reset(token)
+            
+        self.version = max(self.version, version)
+        
+        
+    def _apply_team(self, record: dict[str, Any], force: bool) -> None:
+        
+        team = self.teams.get(record["name"])
+        
+        if team is None:
+            return None
+        
+        version = record["version"]
+        field_versions = self._field_versions.setdefault(team.name, {})
+        fields = set()
+        
+        for field, value in record.items():
+            if field in ("type", "version", "name"):
+                continue
+            
+            # 本地較新的變動優先
+            if not force and field_versions.get(field.removeprefix("new_"), 0) > version:
+                continue
+            
+            if field == "new_point_log":
+                team.point_log.extend(value)
+            elif field == "new_event_log":
+                team.event_log.extend(value)
+            else:
+                setattr(team, field, value)
+                field_versions[field] = version
+                fields.add(field)
+                
+        self._log_marks.setdefault(team.name, []).append((version, len(team.point_log), len(team.event_log)))
+        
+        if fields & {"players", "admins"}:
+            self._rebuild_members()
+        if fields & {"stations", "combos"}:
+            self._count_combo_progress(team.name)
+        if "imprisoned_time" in fields:
+            self._queue_release(team.name)
 
     
 core = Core()
\ No newline at end of file
@@ -0,0 +1,352 @@
+import json
+import logging
+import time
+import uuid
+from typing import Any
+
+from ..config import REDIS_URL
+
+
+log = logging.getLogger(__name__)
+
+LOCK_RETRY_INTERVAL = 0.01
+"""The interval (second) to try again to acquire a lock held by another worker."""
+
+
+class LocalBackend:
+    """
+    The state backend of a single worker. Changes are only kept in the memory of :class:`Core`.
+
+    Properties
+    ----------
+    shared: :type:`bool`
+        If the state is shared with other workers. Always `False`.
+    """
+
+    shared = False
+
+    def __init__(self) -> None:
+        # 以啟動時間為起點，伺服器重啟後舊的版本號不會被誤認
+        self._base = time.time_ns() // 1_000_000
+
+
+    def current_version(self) -> int:
+        """The state version to start from."""
+
+        return self._base
+
+
+    def publish(self, record: dict[str, Any], version: int) -> int:
+        """
+        Publish a change record to the other workers.
+
+        Parameters
+        ----------
+        record: :type:`dict[str, Any]`
+            The change record with `type`, see :class:`Journal`.
+
+        version: :type:`int`
+            The current state version of the worker.
+
+        Returns
+        -------
+        version: :type:`int`
+            The state version of the record.
+        """
+
+        return version + 1
+
+
+    def fetch(self) -> list[dict[str, Any]]:
+        """
+        Fetch the change records published by the other workers since the last fetch.
+
+        Returns
+        -------
+        records: :type:`list[dict[str, Any]]`
+            The records with `version` in the order they were published.
+        """
+
+        return []
+
+
+    def acquire_lock(self, name: str, ttl: int) -> bool:
+        """
+        Acquire or renew a lock shared by every worker.
+
+        Parameters
+        ----------
+        name: :type:`str`
+            The name of the lock.
+
+        ttl: :type:`int`
+            The time (second) before the lock expires if it is not renewed.
+
+        Returns
+        -------
+        acquired: :type:`bool`
+            If this worker holds the lock.
+        """
+
+        return True
+
+
+    def wait_lock(self, name: str, ttl: int, timeout: float) -> bool:
+        """
+        Wait until the lock is acquired, see :meth:`acquire_lock`.
+
+        Parameters
+        ----------
+        name: :type:`str`
+            The name of the lock.
+
+        ttl: :type:`int`
+            The time (second) before the lock expires if it is not released.
+
+        timeout: :type:`float`
+            The maximum time (second) to wait.
+
+        Returns
+        -------
+        acquired: :type:`bool`
+            If this worker holds the lock, `False` if the time is out.
+        """
+
+        deadline = time.monotonic() + timeout
+
+        while not self.acquire_lock(name, ttl):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(LOCK_RETRY_INTERVAL)
+
+        return True
+
+
+    def release_lock(self, name: str) -> None:
+        """Release the lock if this worker holds it."""
+
+        return None
+
+
+    def get_backup_version(self) -> int | None:
+        """The state version of the last backup, or `None` if unknown."""
+
+        return None
+
+
+    def set_backup_version(self, version: int) -> None:
+        """Record the state version of the last backup."""
+
+        return None
+
+
+    def trim(self, version: int) -> None:
+        """
+        Remove the published records already saved to the database.
+
+        Parameters
+        ----------
+        version: :type:`int`
+            The state version of the backup. Records not newer than it are removed.
+        """
+
+        return None
+
+
+class RedisBackend(LocalBackend):
+    """
+    The state backend shared by every worker through a Redis compatible store. \\
+    Every change is pushed to one list in Redis, and the state version of a record is its position in the list, \\
+    so every worker sees the same versions. The records saved to the database are removed from the head of the list, \\
+    the count of the removed records is kept to keep the positions.
+
+    Properties
+    ----------
+    client: :class:`redis.Redis`
+        The Redis client, or any client with the same interface such as `fakeredis.FakeRedis`.
+
+    prefix: :type:`str`
+        The prefix of every key.
+
+    worker_id: :type:`str`
+        The id of this worker, the records published by itself are not fetched.
+    """
+
+    shared = True
+
+    def __init__(self, client, prefix: str="mrt:") -> None:
+        self.client = client
+        self.prefix = prefix
+        self.worker_id = uuid.uuid4().hex
+        self._cursor = 0
+
+        # 第一個啟動的worker決定版本號起點，之後的worker沿用
+        self.client.set(self._key("base"), time.time_ns() // 1_000_000, nx=True)
+        self._base = int(self.client.get(self._key("base")))
+
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str="mrt:") -> "RedisBackend":
+        """Connect to the Redis server of the url. e.g. `redis://localhost:6379/0`"""
+
+        import redis
+
+        return cls(redis.Redis.from_url(url), prefix)
+
+
+    def _key(self, name: str) -> str:
+        return self.prefix + name
+
+
+    def _trimmed(self) -> int:
+
+        trimmed = self.client.get(self._key("trimmed"))
+
+        return int(trimmed) if trimmed is not None else 0
+
+
+    def current_version(self) -> int:
+
+        with self.client.pipeline() as pipe:
+            length, trimmed = pipe.llen(self._key("records")).get(self._key("trimmed")).execute()
+
+        return self._base + int(trimmed or 0) + length
+
+
+    def publish(self, record: dict[str, Any], version: int) -> int:
+
+        line = json.dumps({"worker": self.worker_id, **record}, ensure_ascii=False, default=str)
+
+        # 同一個交易內讀取已刪除的數量，不會與trim交錯
+        with self.client.pipeline() as pipe:
+            length, trimmed = pipe.rpush(self._key("records"), line).get(self._key("trimmed")).execute()
+
+        return self._base + int(trimmed or 0) + length
+
+
+    def fetch(self) -> list[dict[str, Any]]:
+
+        while True:
+            trimmed = self._trimmed()
+            cursor = self._cursor
+            records = []
+
+            # 未讀取的紀錄已寫入資料庫並被刪除，從備份還原後繼續
+            if cursor < trimmed:
+                version = self.get_backup_version()
+                records.append({"type": "restore", "version": version})
+                cursor = version - self._base
+
+            lines = self.client.lrange(self._key("records"), cursor - trimmed, -1)
+
+            # 讀取期間被trim則位置已改變
+            if self._trimmed() == trimmed:
+                break
+
+        for index, line in enumerate(lines, start=cursor + 1):
+            record = json.loads(line)
+
+            if record.pop("worker") == self.worker_id:
+                continue
+
+            record["version"] = self._base + index
+            records.append(record)
+
+        self._cursor = cursor + len(lines)
+
+        return records
+
+
+    def acquire_lock(self, name: str, ttl: int) -> bool:
+
+        key = self._key(f"lock:{name}")
+
+        if self.client.set(key, self.worker_id, nx=True, ex=ttl):
+            return True
+
+        owner = self.client.get(key)
+
+        # 已持有鎖則延長期限
+        if owner is not None and owner.decode() == self.worker_id:
+            self.client.expire(key, ttl)
+            return True
+
+        return False
+
+
+    def release_lock(self, name: str) -> None:
+
+        from redis.exceptions import WatchError
+
+        key = self._key(f"lock:{name}")
+
+        # 確認仍持有鎖才刪除，避免刪除過期後被其他worker取得的鎖
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                owner = pipe.get(key)
+
+                if owner is not None and owner.decode() == self.worker_id:
+                    pipe.multi()
+                    pipe.delete(key)
+                    pipe.execute()
+                else:
+                    pipe.unwatch()
+            except WatchError:
+                pass
+
+
+    def get_backup_version(self) -> int | None:
+
+        version = self.client.get(self._key("backup_version"))
+
+        return int(version) if version is not None else None
+
+
+    def set_backup_version(self, version: int) -> None:
+
+        self.client.set(self._key("backup_version"), version)
+
+
+    def trim(self, version: int) -> None:
+
+        from redis.exceptions import WatchError
+
+        key = self._key("trimmed")
+
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                trimmed = int(pipe.get(key) or 0)
+                count = version - self._base - trimmed
+
+                if count <= 0:
+                    pipe.unwatch()
+                    return None
+
+                pipe.multi()
+                pipe.ltrim(self._key("records"), count, -1)
+                pipe.set(key, trimmed + count)
+                pipe.execute()
+            except WatchError:
+                # 其他worker同時trim，下次備份再刪除
+                return None
+
+        log.debug(f"Trimmed {count} records saved to the database.")
+
+
+def create_backend() -> LocalBackend:
+    """
+    Create the state backend by the `REDIS_URL` environment variable.
+
+    Returns
+    -------
+    backend: :class:`LocalBackend` | :class:`RedisBackend`
+        :class:`RedisBackend` if `REDIS_URL` is set, otherwise :class:`LocalBackend`.
+    """
+
+    if REDIS_URL:
+        log.info("Using the shared state backend.")
+        return RedisBackend.from_url(REDIS_URL)
+
+    return LocalBackend()
@@ -1,7 +1,25 @@
-from ..game_config import COLLAPSE
+from typing import Iterable
+
+from ..game_config import COLLAPSE, COLLAPSE_LIST
 
 class Collapse:
     def __init__(self) -> None:
         self.status = 0
         self.warning = False
-        self.next_time = COLLAPSE[0]["time"]
\ No newline at end of file
+        self.next_time = COLLAPSE[0]["time"]
+        self.stations: set[str] = set(COLLAPSE_LIST) # 已崩塌的站點
+        
+    def add(self, stations: Iterable[str]) -> list[str]:
+        """
+        Collapse the stations.
+        
+        Returns
+        -------
+        stations: :type:`list[str]`
+            The stations newly collapsed, stations already collapsed are skipped.
+        """
+        
+        added = [station for station in dict.fromkeys(stations) if station not in self.stations]
+        self.stations.update(added)
+        
+        return added
@@ -0,0 +1,117 @@
+import math
+from typing import Optional
+
+import pygeohash as pgh
+
+from ..game_config import DISTANCE
+
+
+EARTH_RADIUS = 6371008.8
+"""The mean radius of the earth in meter."""
+
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+"""The length of one degree of latitude in meter."""
+
+
+def haversine(latitude1: float, longitude1: float, latitude2: float, longitude2: float) -> float:
+    """
+    Calculate the great-circle distance between two points.
+
+    Returns
+    -------
+    distance: :type:`float`
+        The distance in meter.
+    """
+
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(longitude2 - longitude1)
+
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(a))
+
+
+class StationIndex:
+    """
+    A grid index of station coordinates for nearest station lookup. \\
+    Every cell is at least `radius` wide, so only the 3x3 cells around a position need to be checked.
+
+    Properties
+    ----------
+    radius: :type:`float`
+        The maximum distance (meter) of a station to be found.
+
+    coordinates: :type:`dict[str, tuple[float, float]]`
+        The latitude and longitude of every station.
+    """
+
+    def __init__(self, station_location: dict[str, str], radius: float=DISTANCE) -> None:
+        self.radius = radius
+        self.coordinates: dict[str, tuple[float, float]] = {
+            station_name: pgh.decode_exactly(geohash)[:2]
+            for station_name, geohash in station_location.items() if geohash
+        }
+
+        # 經度一度的長度隨緯度變短，以最高緯度的站點計算格子寬度
+        max_latitude = max((abs(latitude) for latitude, _ in self.coordinates.values()), default=0.0)
+        self._latitude_size = max(radius, 1.0) / METERS_PER_DEGREE
+        self._longitude_size = self._latitude_size / max(math.cos(math.radians(min(max_latitude + self._latitude_size, 89.0))), 0.01)
+
+        self._cells: dict[tuple[int, int], list[tuple[str, float, float]]] = {}
+        for station_name, (latitude, longitude) in self.coordinates.items():
+            self._cells.setdefault(self._cell(latitude, longitude), []).append((station_name, latitude, longitude))
+
+
+    def _cell(self, latitude: float, longitude: float) -> tuple[int, int]:
+        return math.floor(latitude / self._latitude_size), math.floor(longitude / self._longitude_size)
+
+
+    def nearest(self, latitude: float, longitude: float) -> tuple[Optional[str], Optional[float]]:
+        """
+        Find the nearest station within `radius`.
+
+        Parameters
+        ----------
+        latitude: :type:`float`
+            The latitude of the position.
+
+        longitude: :type:`float`
+            The longitude of the position.
+
+        Returns
+        -------
+        station_name: :type:`str` | :type:`None`
+            The name of the nearest station, or `None` if no station is close enough.
+
+        distance: :type:`float` | :type:`None`
+            The distance (meter) between the station and the position.
+        """
+
+        row, column = self._cell(latitude, longitude)
+        nearest_name, nearest_distance = None, None
+
+        for d_row in (-1, 0, 1):
+            for d_column in (-1, 0, 1):
+                for station_name, station_latitude, station_longitude in self._cells.get((row + d_row, column + d_column), ()):
+                    dis = haversine(latitude, longitude, station_latitude, station_longitude)
+                    if dis <= self.radius and (nearest_distance is None or dis < nearest_distance):
+                        nearest_name, nearest_distance = station_name, dis
+
+        return nearest_name, nearest_distance
+
+
+    def distance(self, station_name: str, latitude: float, longitude: float) -> Optional[float]:
+        """
+        Calculate the distance between the station and the position.
+
+        Returns
+        -------
+        distance: :type:`float` | :type:`None`
+            The distance in meter, or `None` if the station has no location.
+        """
+
+        if station_name not in self.coordinates:
+            return None
+
+        return haversine(latitude, longitude, *self.coordinates[station_name])
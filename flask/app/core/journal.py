@@ -0,0 +1,148 @@
+import json
+import logging
+import os
+import time
+from threading import Lock, Thread
+from typing import Any, TextIO
+
+from ..config import BASEDIR
+from ..game_config import JOURNAL_FLUSH_INTERVAL
+
+
+log = logging.getLogger(__name__)
+
+JOURNAL_PATH = os.path.join(BASEDIR, "journal.ndjson")
+"""The journal of the changes since the last backup, one json record per line."""
+
+
+class Journal:
+    """
+    A write-ahead journal of the game state changes since the last backup. \\
+    Records are written immediately but synced to disk in batches every `flush_interval` seconds.
+
+    Every record has `type` and `version` (the state version of :class:`Core`).
+
+    Properties
+    ----------
+    path: :type:`str`
+        The path of the journal file.
+
+    flush_interval: :type:`float`
+        The interval (second) to sync the journal to disk.
+    """
+
+    def __init__(self, path: str=JOURNAL_PATH, flush_interval: float=JOURNAL_FLUSH_INTERVAL) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self._file: TextIO | None = None
+        self._pending = 0
+        self._lock = Lock()
+
+
+    def open(self) -> None:
+        """Open the journal for appending and start syncing it in the background."""
+
+        if self._file is not None:
+            return None
+
+        self._file = open(self.path, "a", encoding="utf-8")
+        Thread(target=self._run, daemon=True).start()
+
+        log.info(f"Journal opened at {self.path}.")
+
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                log.exception("Failed to sync the journal.")
+
+
+    def append(self, record: dict[str, Any]) -> None:
+        """
+        Append the record to the journal. Nothing is written if the journal is not opened.
+
+        Parameters
+        ----------
+        record: :type:`dict[str, Any]`
+            The record with `type` and `version`.
+        """
+
+        if self._file is None:
+            return None
+
+        line = json.dumps(record, ensure_ascii=False, default=str)
+
+        with self._lock:
+            self._file.write(line + "\n")
+            self._pending += 1
+
+
+    def flush(self) -> None:
+        """Sync the appended records to disk."""
+
+        with self._lock:
+            if self._file is None or self._pending == 0:
+                return None
+
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending = 0
+
+
+    def read(self) -> list[dict[str, Any]]:
+        """
+        Read every record in the journal.
+
+        Returns
+        -------
+        records: :type:`list[dict[str, Any]]`
+            The records in the order they were appended.
+        """
+
+        if not os.path.exists(self.path):
+            return []
+
+        records = []
+
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # 寫到一半當機的最後一行
+                    log.warning("Skipped a broken journal record.")
+
+        return records
+
+
+    def compact(self, version: int) -> None:
+        """
+        Remove the records already saved to the database.
+
+        Parameters
+        ----------
+        version: :type:`int`
+            The state version of the saved snapshot. Records not newer than it are removed.
+        """
+
+        self.flush()
+
+        with self._lock:
+            kept = [record for record in self.read() if record["version"] > version]
+
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                for record in kept:
+                    file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path)
+
+            if self._file is not None:
+                self._file.close()
+                self._file = open(self.path, "a", encoding="utf-8")
+
+        log.debug(f"Journal compacted, {len(kept)} records kept.")
@@ -1,15 +1,21 @@
 import json
 import random
+import hashlib
 import requests
 import logging
 import os
-from typing import Any
+from array import array
+from operator import attrgetter
+from threading import Thread
+from types import MappingProxyType
+from typing import Mapping, Sequence
 
 from ..config import BASEDIR
-from ..game_config import DELETE_STATIONS, IS_SPECIAL, IS_HIDDEN, API_URL_TP, API_URL_NTP, LOCATION_API_URL_TP, LOCATION_API_URL_NTP, STATION_POINTS
-from ..data import load_data
-from ..models import db
+from ..game_config import DELETE_STATIONS, DICE_FACES, IS_SPECIAL, IS_HIDDEN, API_URL_TP, API_URL_NTP, LOCATION_API_URL_TP, LOCATION_API_URL_NTP, STATION_POINTS, TDX_TIMEOUT
+from ..data import load_data, reload_data
+from ..models import bulk_upsert
 from ..models.stations import Stations
+from .geo import StationIndex
 
 
 log = logging.getLogger(__name__)
@@ -19,6 +25,58 @@ headers = {
     "Accept": "application/json",
 }
 
+# DFS🔥🔥🔥
+def reach(offsets: Sequence[int], neighbors: Sequence[int], start: int, target_deep: int) -> tuple[int, ...]:
+    """
+    Calculate the stations can be reached from the station with exactly the steps. \\
+    All the state is local, so it is safe to be called from any thread or greenlet at the same time.
+    
+    Parameters
+    ----------
+    offsets: :type:`Sequence[int]`
+        The CSR offsets of the graph, the neighbors of station `i` are `neighbors[offsets[i]:offsets[i + 1]]`.
+        
+    neighbors: :type:`Sequence[int]`
+        The CSR neighbors of the graph.
+        
+    start: :type:`int`
+        The id of the current station.
+        
+    target_deep: :type:`int`
+        The number of steps to move.
+        
+    Returns
+    -------
+    choice: :type:`tuple[int, ...]`
+        The possible station ids to move.
+    """
+    
+    # dict保留加入順序，當作有序的集合
+    choice: dict[int, dict[int, None]] = {i: {} for i in range(1, target_deep + 1)}
+    visited = bytearray(len(offsets) - 1)
+    
+    def dfs(current_station: int, deep: int) -> list[int]:
+        result = []
+        
+        if deep > target_deep or visited[current_station]:
+            return result
+        
+        visited[current_station] = 1
+        
+        for station in neighbors[offsets[current_station]:offsets[current_station + 1]]:
+            if not visited[station]: result.append(station)
+            result.extend(dfs(station, deep + 1))
+            
+        for s in result:
+            choice[deep].setdefault(s)
+                
+        return result
+    
+    dfs(start, 1)
+    
+    return tuple(choice[target_deep])
+
+
 class Station:
     """
     Properties
@@ -66,43 +124,59 @@ class Station:
               
     point: :type:`int`
         The point of the station.
+        
+    hidden: :type:`bool`
+        If the mission of the station is hidden from the teams that haven't unlocked it.
     """
+    
+    FIELDS = ("sequence", "id", "name", "english_name", "distance", "difficult", "exit", "mission", "tips",
+              "is_special", "is_prison", "point", "geohash", "hidden", "team")
+    """Every attribute of the station, all of them are public."""
+    
+    HIDDEN_FIELDS = ("mission", "tips", "exit")
+    """The attributes masked for the teams that haven't unlocked a hidden station."""
+    
+    __slots__ = FIELDS
+    
+    _getter = attrgetter(*FIELDS)
         
     def __init__(self, station: dict) -> None:
-        self.sequence: int
-        self.id: str
-        self.name: str
-        self.english_name: str
-        self.distance: float
-        self.difficult: int
-        self.exit: str
-        self.mission: str
-        self.tips: str
-        self.is_special: bool
-        self.is_prison: bool
-        self.point: int
-        self.geohash: str
-        self.hidden: bool
+        self.sequence: int = int(station["Sequence"])
+        self.id: str = str(station["StationID"])
+        self.name: str = str(station["StationName"]["Zh_tw"])
+        self.english_name: str = str(station["StationName"]["En"])
+        self.distance: float = float(station["CumulativeDistance"])
+        self.difficult: int = int(station["Difficult"])
+        self.exit: str = str(station["Exit"])
+        self.mission: str = str(station["Mission"])
+        self.tips: str = str(station["Tips"])
+        self.is_special: bool = random.random() <= IS_SPECIAL
+        self.is_prison: bool = station["Mission"] == "監獄"
+        self.point: int = STATION_POINTS.get(str(station["Difficult"]), 0)
+        self.geohash: str = str(station["geohash"])
         
         self.team: str | None = None
         
-        self.__dict__.update({
-            "sequence": int(station["Sequence"]),
-            "id": str(station["StationID"]),
-            "name": str(station["StationName"]["Zh_tw"]),
-            "english_name": str(station["StationName"]["En"]),
-            "distance": float(station["CumulativeDistance"]),
-            "difficult": int(station["Difficult"]),
-            "exit": str(station["Exit"]),
-            "mission": str(station["Mission"]),
-            "tips": str(station["Tips"]),
-            "is_special": random.random() <= IS_SPECIAL,
-            "is_prison": station["Mission"] == "監獄",
-            "point": STATION_POINTS.get(str(station["Difficult"]), 0),
-            "geohash": str(station["geohash"]),
-        })
-        
-        self.hidden = self.is_special or self.is_prison or random.random() <= IS_HIDDEN
+        self.hidden: bool = self.is_special or self.is_prison or random.random() <= IS_HIDDEN
+        
+        
+    def to_public_dict(self, unlocked: bool=True) -> dict:
+        """
+        Get the data of the station for the api.
+        
+        Parameters
+        ----------
+        unlocked: :type:`bool`
+            If the team unlocked the station. If not and the station is hidden, `HIDDEN_FIELDS` are masked.
+        """
+        
+        data = dict(zip(self.FIELDS, self._getter(self)))
+        
+        if self.hidden and not unlocked:
+            for field in self.HIDDEN_FIELDS:
+                data[field] = "隱藏"
+                
+        return data
     
     
     def __str__(self) -> str:
@@ -113,125 +187,315 @@ class Station:
         return self.name
 
 
+def _dump_json(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_PATH = os.path.join(BASEDIR, "data", "metro_snapshot.json")
+SNAPSHOT_SOURCES = ("api_data", "station_location", "station_info")
+
+
+def _fingerprint() -> str:
+    
+    # 來源資料或刪除站點改變時，快照需要重新編譯
+    digest = hashlib.sha1(str(SNAPSHOT_VERSION).encode())
+    digest.update(json.dumps(DELETE_STATIONS, ensure_ascii=False).encode("utf-8"))
+    
+    for filename in SNAPSHOT_SOURCES:
+        path = os.path.join(BASEDIR, "data", f"{filename}.json")
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                digest.update(file.read())
+                
+    return digest.hexdigest()
+
+
+def compile_snapshot(lines: list[dict], locations: list[dict], station_info: dict[str, dict]) -> dict:
+    """
+    Compile the metro data into a snapshot.
+    
+    Parameters
+    ----------
+    lines: :type:`list[dict]`
+        The stations of every line, in the format of TDX `StationOfLine` api.
+        
+    locations: :type:`list[dict]`
+        The locations of every station, in the format of TDX `Station` api.
+        
+    station_info: :type:`dict[str, dict]`
+        The mission information of every station.
+        
+    Returns
+    -------
+    snapshot: :type:`dict`
+        The snapshot with `graph`, `stations` and `station_location`.
+    """
+    
+    # 地理位置
+    station_location: dict[str, str] = {sl["StationName"]["Zh_tw"]: sl["StationPosition"]["GeoHash"] for sl in locations}
+    
+    # 把所有站點以及任務內容等合併
+    stations: dict[str, dict] = {}
+    for line in lines:
+        for station in line["Stations"]:
+            current_station_name: str = station["StationName"]["Zh_tw"]
+            
+            stations[current_station_name] = {
+                **station,
+                **station_info.get(current_station_name, {"Mission": "無", "Exit": "不限", "Difficult": 0, "Tips": "無"}),
+                "geohash": station_location.get(current_station_name, None),
+            }
+    
+    # 把所有站點加上前後站點寫入graph (可以理解成一種linked list)
+    graph: dict[str, list[str]] = {}
+    for line in lines:
+        for index, station in enumerate(line["Stations"]):
+            
+            current_station_name: str = station["StationName"]["Zh_tw"]
+            current_station_id: str = station["StationID"]
+            
+            # 初始化graph節點(若在其他線已被加入則不需重複加入)
+            if current_station_name not in graph:
+                graph[current_station_name] = []
+
+            # 處理支線
+            if current_station_id.endswith("A"):
+                for station in line["Stations"]:
+                    if station["StationID"] == current_station_id[:-1]:
+                        station_name = station["StationName"]["Zh_tw"]
+                        if station_name not in DELETE_STATIONS:
+                            graph[current_station_name].append(station_name)
+                            graph[station_name].append(current_station_name)
+                
+            else:
+                # 如果不是首站
+                if index != 0:
+                    station_name = line["Stations"][index - 1]["StationName"]["Zh_tw"]
+                    if station_name not in DELETE_STATIONS:
+                        graph[current_station_name].append(station_name)
+
+                # 如果不是末站        
+                if index != len(line["Stations"]) - 1:
+                    station_name = line["Stations"][index + 1]["StationName"]["Zh_tw"]
+                    if station_name not in DELETE_STATIONS:
+                        graph[current_station_name].append(station_name)
+                        
+    # 去除未被使用的站點
+    graph = {
+        current_station_name: [station_name for station_name in neighbors if station_name not in DELETE_STATIONS]
+        for current_station_name, neighbors in graph.items() if current_station_name not in DELETE_STATIONS
+    }
+    
+    return {
+        "version": SNAPSHOT_VERSION,
+        "graph": graph,
+        "stations": {station_name: stations[station_name] for station_name in graph},
+        "station_location": station_location,
+    }
+    
+    
+def build_snapshot() -> dict:
+    """
+    Compile the snapshot from the local data files and save it, no network is needed.
+    
+    Returns
+    -------
+    snapshot: :type:`dict`
+        The compiled snapshot.
+    """
+    
+    snapshot = compile_snapshot(load_data("api_data"), load_data("station_location"), load_data("station_info"))
+    snapshot["fingerprint"] = _fingerprint()
+    
+    try:
+        with open(SNAPSHOT_PATH + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(snapshot, file, ensure_ascii=False)
+        os.replace(SNAPSHOT_PATH + ".tmp", SNAPSHOT_PATH)
+        log.info("Metro snapshot saved.")
+        
+    except OSError as e:
+        log.error(f"Failed to save metro snapshot: {e}")
+        
+    return snapshot
+
+
+def load_snapshot() -> dict:
+    """
+    Load the compiled snapshot, recompile it if it's missing or the data files are changed.
+    
+    Returns
+    -------
+    snapshot: :type:`dict`
+        The snapshot.
+    """
+    
+    if os.path.exists(SNAPSHOT_PATH):
+        try:
+            with open(SNAPSHOT_PATH, "r", encoding="utf-8") as file:
+                snapshot: dict = json.load(file)
+                
+            if snapshot.get("fingerprint") == _fingerprint():
+                return snapshot
+            
+        except (OSError, ValueError) as e:
+            log.error(f"Failed to load metro snapshot: {e}")
+        
+    log.info("Metro snapshot is outdated, recompiling.")
+    
+    return build_snapshot()
+
+
+def refresh_snapshot(timeout: float=TDX_TIMEOUT) -> bool:
+    """
+    Download the latest data from TDX, save it to the local data files and recompile the snapshot. \\
+    The new data is used from the next :class:`MetroSystem`, i.e. the next game.
+    
+    Parameters
+    ----------
+    timeout: :type:`float`
+        The timeout (second) of every request.
+        
+    Returns
+    -------
+    result: :type:`bool`
+        If the data is refreshed.
+    """
+    
+    data: dict[str, list] = {"api_data": [], "station_location": []}
+    
+    try:
+        for filename, url in (("api_data", API_URL_TP), ("api_data", API_URL_NTP), ("station_location", LOCATION_API_URL_TP), ("station_location", LOCATION_API_URL_NTP)):
+            response = requests.get(url, headers=headers, timeout=timeout).json()
+            
+            # API可能被rate limit，保留本地資料
+            if isinstance(response, dict):
+                log.error(response.get("message", response))
+                return False
+            
+            data[filename].extend(response)
+            
+    except (requests.RequestException, ValueError) as e:
+        log.error(f"Failed to refresh metro data: {e}")
+        return False
+    
+    # 儲存API資料到本地
+    for filename, response in data.items():
+        with open(os.path.join(BASEDIR, "data", f"{filename}.json"), "w", encoding="utf-8") as file:
+            json.dump(response, file, ensure_ascii=False, indent=4)
+        reload_data(filename)
+        
+    build_snapshot()
+    
+    log.info("Metro data refreshed from TDX.")
+    
+    return True
+
+
+def refresh_snapshot_background(timeout: float=TDX_TIMEOUT) -> Thread:
+    """
+    Run :func:`refresh_snapshot` in a background thread.
+    
+    Returns
+    -------
+    thread: :class:`Thread`
+        The started thread.
+    """
+    
+    thread = Thread(target=refresh_snapshot, args=(timeout,), name="metro-refresh", daemon=True)
+    thread.start()
+    
+    return thread
+
+
 class MetroSystem:
     """
+    The stations have dense integer ids in the order of the graph, \\
+    and the adjacency is kept in CSR arrays so the graph algorithms work on ids only.
+    
     Properties
     ----------
-    `station_name`: :class:`Station`
-        The station object.
+    stations: :type:`list[Station]`
+        The station objects by id.
+        
+    names: :type:`tuple[str, ...]`
+        The station names by id.
+        
+    ids: :type:`dict[str, int]`
+        The id of every station name.
+        
+    offsets: :type:`array`
+        The CSR offsets, the neighbors of station `i` are `neighbors[offsets[i]:offsets[i + 1]]`.
+        
+    neighbors: :type:`array`
+        The CSR neighbor ids.
+        
+    graph: :type:`dict[str, list[str]]`
+        The adjacency by station names, built from the CSR arrays.
     """
     
     def __init__(self) -> None:
-        self.graph: dict[str, list] = {}
-        self.station_info: dict[str, dict] = load_data("station_info")
+        self.stations: list[Station] = []
+        self.names: tuple[str, ...] = ()
+        self.ids: dict[str, int] = {}
+        self.offsets: array = array("i", [0])
+        self.neighbors: array = array("i")
+        self.graph: dict[str, list[str]] = {}
+        self._reachable: tuple[tuple[tuple[int, ...], ...], ...] = () # [station id][step - 1] -> station ids
+        self._station_json: list[tuple[bytes, bytes]] = [] # [station id] -> (public json, masked json)
+        self._station_responses: dict[frozenset[int], tuple[bytes, str]] = {} # {unlocked hidden station ids: (payload, etag)}
         self.station_location: dict[str, str] = {}
+        self.station_index: StationIndex = StationIndex({})
+        self._saved_stations: dict[str, dict] = {} # {station: saved row}
         self.is_loaded: bool = False
-        self._load_location(LOCATION_API_URL_TP)
-        self._load_location(LOCATION_API_URL_NTP)
-        self._load(API_URL_TP)
-        self._load(API_URL_NTP)
+        self._load(load_snapshot())
+        self._build_reachable()
+        self.station_index = StationIndex({name: geohash for name, geohash in self.station_location.items() if name in self.graph})
         self.is_loaded = True
         
         log.info("Metro system loaded.")
-            
-            
-    def _load_location(self, url: str, save: bool=False) -> None:
         
-        # 取得並寫入地理位置
-        if self.station_location:
-            return None
         
-        response: list[dict] = requests.get(url, headers=headers).json()
+    def _load(self, snapshot: dict) -> None:
         
-        # API可能被rate limit，改用本地資料
-        if "message" in response:
-            log.error(response["message"])
-            response = load_data("station_location")
-
-        # 主動儲存API資料到本地        
-        if save:
-            with open(os.path.join(BASEDIR, "data", "station_location.json"), "r+", encoding="utf-8") as file:
-                data: list = json.load(file)
-                for station in response:
-                    if station not in data:
-                        data.append(station)
-                json.dump(data, file, ensure_ascii=False, indent=4)
-
-        # 寫入地理位置        
-        self.station_location = {sl["StationName"]["Zh_tw"]: sl["StationPosition"]["GeoHash"] for sl in response}
+        self.station_location = dict(snapshot["station_location"])
         
+        self.names = tuple(snapshot["graph"].keys())
+        self.ids = {station_name: index for index, station_name in enumerate(self.names)}
         
-    def _load(self, url: str, save: bool=False) -> None:
+        # 每場遊戲重新建立Station物件，讓特殊站和隱藏站重新抽選
+        self.stations = [Station(snapshot["stations"][station_name]) for station_name in self.names]
         
-        if self.is_loaded:
-            return None
+        self.offsets = array("i", [0])
+        self.neighbors = array("i")
+        for station_name in self.names:
+            self.neighbors.extend(self.ids[neighbor] for neighbor in snapshot["graph"][station_name])
+            self.offsets.append(len(self.neighbors))
+            
+        self.graph = {station_name: self.neighbor_names(station_name) for station_name in self.names}
         
-        response: list[dict] = requests.get(url, headers=headers).json()
         
-        if "message" in response:
-            log.error(response["message"])
-            response = load_data("api_data")
-            self.is_loaded = True
-                
-        if save:
-            with open(os.path.join(BASEDIR, "data", "api_data.json"), "r+", encoding="utf-8") as file:
-                data: list = json.load(file)
-                for line in response:
-                    if line not in data:
-                        data.append(line)
-                json.dump(data, file, ensure_ascii=False, indent=4)
-        
-        # 把所有API取得的站點以及任務內容等寫入Station物件並加入MetroSystem的屬性
-        for line in response:
-            for station in line["Stations"]:
-                station: dict[str, Any]
-                
-                current_station_name: str = station["StationName"]["Zh_tw"]
-                
-                if current_station_name in self.station_info:
-                    station.update(self.station_info[current_station_name])
-                else:
-                    station.update({"Mission": "無", "Exit": "不限", "Difficult": 0, "Tips": "無"})
-                    
-                station["geohash"] = self.station_location.get(current_station_name, None)
-                
-                setattr(self, station["StationName"]["Zh_tw"], Station(station))
-
-        # 把所有站點加上前後站點寫入graph (可以理解成一種linked list)
-        for line in response:
-            for index, station in enumerate(line["Stations"]):
-                
-                current_station_name: str = station["StationName"]["Zh_tw"]
-                current_station_id: str = station["StationID"]
-                
-                # 初始化graph節點(若在其他線已被加入則不需重複加入)
-                if current_station_name not in self.graph:
-                    self.graph[current_station_name] = []
-
-                # 處理支線
-                if current_station_id.endswith("A"):
-                    for station in line["Stations"]:
-                        if station["StationID"] == current_station_id[:-1]:
-                            station_name = station["StationName"]["Zh_tw"]
-                            if station_name not in DELETE_STATIONS:
-                                self.graph[current_station_name].append(station_name)
-                                self.graph[station_name].append(current_station_name)
-                    
-                else:
-                    # 如果不是首站
-                    if index != 0:
-                        station_name = line["Stations"][index - 1]["StationName"]["Zh_tw"]
-                        if station_name not in DELETE_STATIONS:
-                            self.graph[current_station_name].append(station_name)
-
-                    # 如果不是末站        
-                    if index != len(line["Stations"]) - 1:
-                        station_name = line["Stations"][index + 1]["StationName"]["Zh_tw"]
-                        if station_name not in DELETE_STATIONS:
-                            self.graph[current_station_name].append(station_name)
-                
-        # 去除未被使用的站點
-        self.delete_stations()
+    def neighbor_names(self, name: str) -> list[str]:
+        """
+        Get the names of the next stations.
+        
+        Parameters
+        ----------
+        name: :type:`str`
+            The name of the station.
+            
+        Returns
+        -------
+        stations: :type:`list[str]`
+            The names of the next stations, empty if the station does not exist.
+        """
+        
+        index = self.ids.get(name)
+        
+        if index is None:
+            return []
+        
+        return [self.names[neighbor] for neighbor in self.neighbors[self.offsets[index]:self.offsets[index + 1]]]
             
     
     def find_station(self, name: str) -> Station | None:
@@ -248,8 +512,10 @@ class MetroSystem:
         station: :class:`Station`
             The station object.
         """
-                
-        return self.__dict__.get(name, None)
+        
+        index = self.ids.get(name)
+        
+        return self.stations[index] if index is not None else None
     
     
     def move(self, name: str) -> list[str] | None:
@@ -270,35 +536,171 @@ class MetroSystem:
         return self.graph.get(name, None)
     
     
-    def delete_stations(self) -> None:
-        for station_name in DELETE_STATIONS:
-            self.graph.pop(station_name, None)
-            if station_name in self.__dict__:
-                delattr(self, station_name)
+    def reachable_stations(self, name: str, step: int) -> list[str]:
+        """
+        Get the stations can be reached from the station with exactly the steps.
+        
+        Parameters
+        ----------
+        name: :type:`str`
+            The name of the current station.
             
-        for current_station_name in self.graph:
-            for station_name in self.graph[current_station_name]:
-                if station_name in DELETE_STATIONS:
-                    self.graph[current_station_name].remove(station_name)
-
-    def save_stations(self):
-        """Save stations to the database."""
-        for station in self.graph:
-            station_obj = self.find_station(station)
-            if station_obj:
-                db_station = Stations.query.filter_by(name=station_obj.name).first()
-                if db_station is None:
-                    db_station = Stations(
-                        name=station_obj.name,
-                        is_special=station_obj.is_special,
-                        hidden=station_obj.hidden,
-                        owner_team=station_obj.team
-                    )
-                    db.session.add(db_station)
-                else:
-                    Stations.query.filter_by(name=station_obj.name).update({"is_special": station_obj.is_special, "hidden": station_obj.hidden, "owner_team": station_obj.team})
-        
-        db.session.commit()
+        step: :type:`int`
+            The number of steps to move.
+            
+        Returns
+        -------
+        choice: :type:`list[str]`
+            The list of possible station names to move.
+        """
+        
+        index = self.ids.get(name)
+        
+        if index is None or step < 1:
+            return []
+        
+        if step <= len(self._reachable[index]):
+            choice = self._reachable[index][step - 1]
+        else:
+            # 超過預先計算的步數才即時計算
+            choice = reach(self.offsets, self.neighbors, index, step)
+            
+        return [self.names[station] for station in choice]
+    
+    
+    def _build_reachable(self) -> None:
+        
+        # 預先計算每一站走1~DICE_FACES步可到達的站點，之後的移動計算都只讀這份資料
+        self._reachable = tuple(
+            tuple(reach(self.offsets, self.neighbors, index, step) for step in range(1, DICE_FACES + 1))
+            for index in range(len(self.names))
+        )
+    
+    
+    def invalidate_stations(self) -> None:
+        """Drop the cached payloads of :meth:`public_stations`. Call it after the owner, hidden or special status of a station changed."""
+        
+        self._station_json = []
+        self._station_responses.clear()
+        
+        
+    def public_stations(self, unlocked: set[str]) -> tuple[bytes, str]:
+        """
+        Get the json of every station for the api, with the hidden stations masked except the unlocked ones. \\
+        The json of every station is serialized once, and the payload is cached for every set of unlocked hidden stations.
+        
+        Parameters
+        ----------
+        unlocked: :type:`set[str]`
+            The names of the stations the team unlocked.
+            
+        Returns
+        -------
+        payload: :type:`bytes`
+            The json list of :meth:`Station.to_public_dict`.
+            
+        etag: :type:`str`
+            The etag of the payload.
+        """
+        
+        # 只有隱藏站會因解鎖而不同，以解鎖的隱藏站作為快取鍵
+        key = frozenset(self.ids[name] for name in unlocked if name in self.ids and self.stations[self.ids[name]].hidden)
+        cached = self._station_responses.get(key)
+        
+        if cached is not None:
+            return cached
+        
+        if not self._station_json:
+            self._station_json = [
+                (_dump_json(station.to_public_dict()), _dump_json(station.to_public_dict(False)))
+                for station in self.stations
+            ]
+            
+        payload = b"[" + b",".join(
+            public if index in key else masked
+            for index, (public, masked) in enumerate(self._station_json)
+        ) + b"]"
+        
+        cached = (payload, hashlib.blake2b(payload, digest_size=16).hexdigest())
+        self._station_responses[key] = cached
+        
+        return cached
+    
+    
+    def snapshot_stations(self) -> dict[str, Mapping]:
+        """
+        Copy the mutable status of every station.
+        
+        Returns
+        -------
+        stations: :type:`dict[str, Mapping]`
+            `{station: {"name", "is_special", "hidden", "owner_team"}}`, same as the columns of :class:`Stations`.
+        """
+        
+        return {
+            station.name: MappingProxyType({"name": station.name, "is_special": station.is_special, "hidden": station.hidden, "owner_team": station.team})
+            for station in self.stations
+        }
+    
+    
+    def restore_stations(self, stations: list[Mapping]) -> None:
+        """
+        Set the owner, hidden and special status of the stations.
+        
+        Parameters
+        ----------
+        stations: :type:`list[Mapping]`
+            The rows of :meth:`snapshot_stations`.
+        """
+        
+        for row in stations:
+            station = self.find_station(row["name"])
+            
+            if station is None:
+                continue
+            
+            station.team = row["owner_team"]
+            station.hidden = row["hidden"]
+            station.is_special = row["is_special"]
+            
+        self.invalidate_stations()
+    
+    
+    def save_stations(self, stations: Mapping[str, Mapping] | None=None) -> int:
+        """
+        Save the changed stations to the database since the last save, without committing. \\
+        Use :meth:`Core.backup` to save everything in one transaction.
+        
+        Parameters
+        ----------
+        stations: :type:`Mapping[str, Mapping]`
+            The result of :meth:`snapshot_stations` to save. If not given, take a new one.
+        
+        Returns
+        -------
+        count: :type:`int`
+            The number of written stations.
+        """
+        
+        if stations is None:
+            stations = self.snapshot_stations()
+        
+        rows = [dict(row) for name, row in stations.items() if row != self._saved_stations.get(name)]
+                    
+        bulk_upsert(Stations, rows)
+        
+        self._saved_stations.update({row["name"]: row for row in rows})
+        
+        log.debug(f"Saved {len(rows)} changed stations.")
+        
+        return len(rows)
+    
+    
+    def invalidate_saved(self) -> None:
+        """Forget which stations were saved, so :meth:`save_stations` writes every station next time. e.g. after a failed backup."""
+        
+        self._saved_stations.clear()
+        
 
     def load_stations(self):
         """Load stations from the database."""
@@ -308,6 +710,13 @@ class MetroSystem:
             if not station_obj:
                 continue
 
+            # is_special的欄位是字串，False會被存成"0"
+            is_special = station.is_special not in (None, "", "0", "False", "false")
+            
             station_obj.team = station.owner_team
             station_obj.hidden = station.hidden
-            station_obj.is_special = station.is_special
+            station_obj.is_special = is_special
+            
+            self._saved_stations[station.name] = {"name": station.name, "is_special": is_special, "hidden": station.hidden, "owner_team": station.owner_team}
+            
+        self.invalidate_stations()
@@ -0,0 +1,150 @@
+import logging
+from typing import Any, Callable
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.base import BaseScheduler
+from flask import Flask
+
+from ..game_config import SCHEDULER_LOCK_TTL
+from .backend import LocalBackend
+
+
+log = logging.getLogger(__name__)
+
+
+class Scheduler:
+    """
+    The single scheduler of every timed job of the game. \\
+    Jobs have unique names, adding a job with an existing name replaces it, so jobs can be added again safely.
+
+    When the state is shared by many workers, every worker schedules the jobs but only the worker holding \\
+    the `"scheduler"` lock of the backend runs them.
+
+    Properties
+    ----------
+    backend: :class:`LocalBackend`
+        The state backend of :class:`Core`, for the lock.
+
+    before: :type:`Callable[[], None]` | :type:`None`
+        Called before every job in the app context. e.g. :meth:`Core.sync_backend`
+
+    lock_ttl: :type:`int`
+        The time (second) before another worker takes over the jobs if this worker stopped.
+
+    app: :class:`Flask` | :type:`None`
+        The flask app, jobs run in its app context if it is set.
+    """
+
+    def __init__(self, backend: LocalBackend, before: Callable[[], None] | None=None, lock_ttl: int=SCHEDULER_LOCK_TTL) -> None:
+        self.backend = backend
+        self.before = before
+        self.lock_ttl = lock_ttl
+        self.app: Flask | None = None
+        self._scheduler = self._create_scheduler()
+
+
+    @staticmethod
+    def _create_scheduler() -> BaseScheduler:
+
+        # gevent下以greenlet執行，不另外開執行緒池
+        try:
+            from gevent import monkey
+        except ImportError:
+            monkey = None
+
+        if monkey is not None and monkey.is_module_patched("threading"):
+            from apscheduler.schedulers.gevent import GeventScheduler
+            return GeventScheduler()
+
+        return BackgroundScheduler()
+
+
+    @property
+    def running(self) -> bool:
+        return self._scheduler.running
+
+
+    def start(self) -> None:
+        """Start running the jobs."""
+
+        if self._scheduler.running:
+            return None
+
+        # 定期續約，避免兩次排程之間鎖過期而被其他worker接手
+        if self.backend.shared:
+            self._scheduler.add_job(self._renew_lock, "interval", seconds=max(self.lock_ttl // 3, 1),
+                                    id="scheduler_lock", replace_existing=True)
+
+        self._scheduler.start()
+
+        log.info(f"Scheduler started with {type(self._scheduler).__name__}.")
+
+
+    def shutdown(self) -> None:
+        """Stop running the jobs."""
+
+        if self._scheduler.running:
+            self._scheduler.shutdown(wait=False)
+
+
+    def add(self, name: str, func: Callable[[], None], trigger: str, **trigger_args: Any) -> None:
+        """
+        Add the job, or replace the job with the same name.
+
+        Parameters
+        ----------
+        name: :type:`str`
+            The unique name of the job. e.g. `"collapse_damage"`
+
+        func: :type:`Callable[[], None]`
+            The job.
+
+        trigger: :type:`str`
+            The trigger of APScheduler. e.g. `"date"`, `"interval"`
+
+        trigger_args: :type:`Any`
+            The arguments of the trigger. e.g. `run_date=...`, `minutes=1`
+        """
+
+        # 排程器啟動前replace_existing不會取代尚未加入的工作
+        self.remove(name)
+        self._scheduler.add_job(self._run, trigger, args=[name, func], id=name, name=name, replace_existing=True,
+                                max_instances=1, coalesce=True, misfire_grace_time=None, **trigger_args)
+
+        log.debug(f"Scheduled job {name} ({trigger}, {trigger_args}).")
+
+
+    def remove(self, name: str) -> None:
+        """Remove the job if it exists."""
+
+        if self._scheduler.get_job(name) is not None:
+            self._scheduler.remove_job(name)
+
+
+    def jobs(self) -> list[str]:
+        """The names of the scheduled jobs."""
+
+        return [job.id for job in self._scheduler.get_jobs() if job.id != "scheduler_lock"]
+
+
+    def _renew_lock(self) -> None:
+        self.backend.acquire_lock("scheduler", self.lock_ttl)
+
+
+    def _run(self, name: str, func: Callable[[], None]) -> None:
+
+        if not self.backend.acquire_lock("scheduler", self.lock_ttl):
+            log.debug(f"Job {name} skipped, another worker runs the jobs.")
+            return None
+
+        try:
+            # 在排程的執行緒上使用自己的app context及資料庫session，不經過HTTP請求
+            if self.app is None:
+                func()
+            else:
+                with self.app.app_context():
+                    if self.before is not None:
+                        self.before()
+                    func()
+        except Exception:
+            log.exception(f"Job {name} failed.")
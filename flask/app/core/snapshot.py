@@ -0,0 +1,58 @@
+from types import MappingProxyType
+from typing import Any, Mapping
+
+
+class GameSnapshot:
+    """
+    A read-only copy of the game state at one state version, for backups. \\
+    Taking a snapshot only copies the teams changed since the last snapshot (see :meth:`Core.snapshot`),
+    and the append-only lists are kept as `(list, length)` so they are never copied.
+
+    Properties
+    ----------
+    version: :type:`int`
+        The state version of :class:`Core` when the snapshot was taken.
+
+    teams: :type:`Mapping[str, Mapping[str, Any]]`
+        The data of every team without the lists in `LOG_TABLES`.
+
+    logs: :type:`Mapping[str, Mapping[str, tuple[list, int]]]`
+        The list in `LOG_TABLES` of every team and its length when the snapshot was taken.
+
+    stations: :type:`Mapping[str, Mapping[str, Any]]`
+        The owner, hidden and special status of every station.
+
+    collapse: :type:`Mapping[str, Any]`
+        The collapse status, warning, next time and collapsed stations.
+    """
+
+    def __init__(self, version: int, teams: dict[str, Mapping[str, Any]], logs: dict[str, Mapping[str, tuple[list, int]]],
+                 stations: dict[str, Mapping[str, Any]], collapse: dict[str, Any]) -> None:
+        self.version = version
+        self.teams: Mapping[str, Mapping[str, Any]] = MappingProxyType(teams)
+        self.logs: Mapping[str, Mapping[str, tuple[list, int]]] = MappingProxyType(logs)
+        self.stations: Mapping[str, Mapping[str, Any]] = MappingProxyType(stations)
+        self.collapse: Mapping[str, Any] = MappingProxyType(collapse)
+
+
+    def entries(self, name: str, field: str) -> list:
+        """
+        Get the entries of the list of the team when the snapshot was taken.
+
+        Parameters
+        ----------
+        name: :type:`str`
+            The name of the team.
+
+        field: :type:`str`
+            The attribute in `LOG_TABLES`. e.g. `"point_log"`
+
+        Returns
+        -------
+        entries: :type:`list`
+            A copy of the entries.
+        """
+
+        entries, count = self.logs[name][field]
+
+        return entries[:count]
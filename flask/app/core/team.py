@@ -1,9 +1,35 @@
 from datetime import datetime
+from operator import attrgetter
 from typing import Optional
 
 from ..game_config import START_STATION
 
+
+LOG_FIELDS = ("point_log", "event_log")
+
+FIELDS = (
+    "name", "start_location_defined", "location", "target_location", "players", "admins",
+    "point_log", "event_log", "point", "step", "current_mission_finished", "current_card",
+    "imprisoned_time", "is_imprisoned", "stations", "owned_stations", "combos", "choice",
+)
+"""Every attribute of :class:`Team` in order."""
+
+SECRET_FIELDS = ("current_card", "choice")
+"""The attributes only for the team itself and the admins, never in the public data."""
+
+SUMMARY_FIELDS = tuple(field for field in FIELDS if field not in LOG_FIELDS and field not in SECRET_FIELDS)
+
+PUBLIC_FIELDS = tuple(field for field in FIELDS if field not in SECRET_FIELDS)
+
+PRIVATE_FIELDS = (*SECRET_FIELDS, *LOG_FIELDS)
+"""The attributes only pushed to the team itself and the admins, the others only get the log counts."""
+
+_getters: dict[tuple[str, ...], attrgetter] = {}
+
+
 class Team:
+    __slots__ = FIELDS
+    
     def __init__(self, name: str, players: Optional[list[str]]=None, admins: Optional[list[str]]=None, location: Optional[str]=None) -> None:
         self.name: str = name
         self.start_location_defined: bool = location is not None
@@ -20,7 +46,7 @@ class Team:
         self.current_mission_finished: bool = True # 用2表示正在移動過程 # 開玩笑的別這麼做
         self.current_card: Optional[str] = None
         
-        self.imprisoned_time: int = 0
+        self.imprisoned_time: int = 0 # 出獄時間 (unix timestamp，秒)，未被關押時為0
         self.is_imprisoned: bool = False
         
         self.stations: list[str] = []
@@ -51,8 +77,46 @@ class Team:
             "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
         self.event_log.append(data)
+        
+    def summary(self) -> dict:
+        """
+        The public data of the team without `point_log` and `event_log`, only their lengths. \\
+        The logs can be fetched page by page by `/api/team/<name>/point_log` and `/api/team/<name>/event_log`. \\
+        `SECRET_FIELDS` are not included.
+        """
+        
+        data = self.to_dict(SUMMARY_FIELDS)
+        data["point_log_count"] = len(self.point_log)
+        data["event_log_count"] = len(self.event_log)
+        
+        return data
 
+    def to_dict(self, fields: tuple[str, ...]=FIELDS) -> dict:
+        """
+        Get the attributes of the team. The values are not copied.
+        
+        Parameters
+        ----------
+        fields: :type:`tuple[str, ...]`
+            The attributes to get, every attribute by default.
+        """
+        
+        # 每組欄位只建立一次attrgetter
+        getter = _getters.get(fields)
+        if getter is None:
+            getter = _getters[fields] = attrgetter(*fields)
+            
+        return dict(zip(fields, getter(self)))
+    
+    
+    def to_public_dict(self) -> dict:
+        """The full public data of the team with the logs, for the api. `SECRET_FIELDS` are not included."""
+        
+        return self.to_dict(PUBLIC_FIELDS)
+    
+    
     def replace_data(self, team: "Team") -> None:
+        # point_log, event_log, stations, owned_stations 由 Core.load_team 另外載入
         self.name: str = team.name
         self.start_location_defined: bool = team.start_location_defined
         self.location: str = team.location
@@ -60,8 +124,6 @@ class Team:
         self.players = team.players
         self.admins = team.admins
         
-        self.point_log: list[dict] = team.point_log
-        self.event_log: list[dict] = team.event_log
         self.point: int = team.point
         self.step: int = team.step
         
@@ -71,7 +133,5 @@ class Team:
         self.imprisoned_time: int = team.imprisoned_time
         self.is_imprisoned: bool = team.is_imprisoned
         
-        self.stations: list[str] = team.stations
-        self.owned_stations: list[str] = team.owned_stations
         self.combos: list[str] = team.combos
         self.choice: list[str] = team.choice
\ No newline at end of file
@@ -1,18 +1,130 @@
 import os
 import json
+import time
 import logging
+from typing import Any
 
 from ..config import BASEDIR
 
 
 log = logging.getLogger(__name__)
 
+CHECK_INTERVAL = 5.0
+"""The minimum interval (second) between checking if a data file is changed."""
 
-def load_data(filename: str) -> dict:
+_cache: dict[str, tuple[float, Any]] = {} # {filename: (mtime, data)}
+_checked: dict[str, float] = {} # {filename: last check time}
+
+
+class FrozenDict(dict):
+    """
+    A read-only `dict` of the loaded data. It is still a `dict`, so it can be encoded to json directly. \\
+    `copy.copy` and `copy.deepcopy` return modifiable copies.
+    """
+    
+    def _read_only(self, *args, **kwargs) -> None:
+        raise TypeError("The loaded data is read-only, copy it before modifying.")
+    
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+    
+    
+    def copy(self) -> dict:
+        return dict(self)
+    
+    
+    def __copy__(self) -> dict:
+        return dict(self)
+    
+    
+    def __deepcopy__(self, memo: dict) -> dict:
+        return thaw(self)
+    
+    
+def freeze(data: Any) -> Any:
+    """Convert the parsed json to read-only, `dict` to :class:`FrozenDict` and `list` to `tuple`."""
+    
+    if isinstance(data, dict):
+        return FrozenDict((key, freeze(value)) for key, value in data.items())
+    
+    if isinstance(data, list):
+        return tuple(freeze(value) for value in data)
+    
+    return data
+
+
+def thaw(data: Any) -> Any:
+    """Convert the read-only data of :func:`freeze` back to modifiable `dict` and `list`."""
     
-    if not os.path.exists(os.path.join(BASEDIR, "data", f"{filename}.json")):
+    if isinstance(data, dict):
+        return {key: thaw(value) for key, value in data.items()}
+    
+    if isinstance(data, (list, tuple)):
+        return [thaw(value) for value in data]
+    
+    return data
+
+
+def load_data(filename: str) -> Any:
+    """
+    Load the data file, the parsed data is cached and only reloaded when the file is changed. \\
+    The returned object is shared by every caller, so it is read-only (see :func:`freeze`). \\
+    Use `copy.deepcopy` or :func:`thaw` to get a modifiable copy.
+    
+    Parameters
+    ----------
+    filename: :type:`str`
+        The name of the data file without extension.
+        
+    Returns
+    -------
+    data: :class:`FrozenDict` | :type:`tuple`
+        The parsed data.
+    """
+    
+    cached = _cache.get(filename)
+    now = time.monotonic()
+    
+    # 短時間內不重複檢查檔案
+    if cached is not None and now - _checked.get(filename, 0.0) < CHECK_INTERVAL:
+        return cached[1]
+    
+    path = os.path.join(BASEDIR, "data", f"{filename}.json")
+    
+    if not os.path.exists(path):
         log.warning(f"File {filename}.json not found.")
         return {}
     
-    with open(os.path.join(BASEDIR, "data", f"{filename}.json"), "r", encoding="utf-8") as file:
-        return json.load(file)
\ No newline at end of file
+    _checked[filename] = now
+    mtime = os.path.getmtime(path)
+    
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    
+    with open(path, "r", encoding="utf-8") as file:
+        data = freeze(json.load(file))
+        
+    _cache[filename] = (mtime, data)
+    
+    if cached is not None:
+        log.info(f"File {filename}.json reloaded.")
+        
+    return data
+
+
+def reload_data(filename: str | None=None) -> None:
+    """
+    Drop the cached data, so it will be loaded from the file next time.
+    
+    Parameters
+    ----------
+    filename: :type:`str`
+        The name of the data file without extension. If not given, drop all cached data.
+    """
+    
+    if filename is None:
+        _cache.clear()
+        _checked.clear()
+    else:
+        _cache.pop(filename, None)
+        _checked.pop(filename, None)
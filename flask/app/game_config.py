@@ -15,6 +15,9 @@ GAME_ADMIN_TEAM_NAME: str = GAME_CONFIG.get("game_admin_team_name", "Game Admins
 CARD_COUNT: int = GAME_CONFIG.get("card_count")
 """The number of card in the game."""
 
+DICE_FACES: int = GAME_CONFIG.get("dice_faces", 6)
+"""The number of faces of the dice, the reachable stations of every step up to it are precomputed. Default is 6."""
+
 DISTANCE: float = GAME_CONFIG.get("distance", 500.0)
 """The minimum effective distance between the team and the station. Default is 500.0."""
 
@@ -46,6 +49,27 @@ IMPRISONED_TIME: dict[str, int] = GAME_CONFIG.get("imprisoned_time", {"min": 5,
 BACKUP_INTERVAL: int = GAME_CONFIG.get("backup_interval", 3)
 """The interval of auto backup in minute. Default is 3."""
 
+IDENTITY_CACHE_TTL: int = GAME_CONFIG.get("identity_cache_ttl", 300)
+"""The time (second) to cache the discord user of a login token. Default is 300."""
+
+JOURNAL_FLUSH_INTERVAL: float = GAME_CONFIG.get("journal_flush_interval", 1.0)
+"""The interval (second) to sync the journal of changes to disk. Default is 1.0."""
+
+SCHEDULER_LOCK_TTL: int = GAME_CONFIG.get("scheduler_lock_ttl", 90)
+"""The time (second) before another worker takes over the scheduled jobs if the worker running them stopped. Default is 90."""
+
+STATE_LOCK_TTL: int = GAME_CONFIG.get("state_lock_ttl", 10)
+"""The time (second) before the state lock of a stopped worker expires, when the state is shared by many workers. Default is 10."""
+
+STATE_LOCK_TIMEOUT: float = GAME_CONFIG.get("state_lock_timeout", 15.0)
+"""The maximum time (second) to wait for the state lock held by another worker. Default is 15.0."""
+
+LOG_PAGE_SIZE: int = GAME_CONFIG.get("log_page_size", 100)
+"""The default number of log entries in a page of the log api. Default is 100."""
+
+MAX_LOG_PAGE_SIZE: int = GAME_CONFIG.get("max_log_page_size", 1000)
+"""The maximum number of log entries in a page of the log api. Default is 1000."""
+
 COLLAPSE: list[dict] = GAME_CONFIG.get("collapse", [])
 """The collapse setting of the game.
 
@@ -66,6 +90,10 @@ COLLAPSE_LIST: list[str] = GAME_CONFIG.get("collapse_list", [])
 """The list of stations that collapsed in the beginning."""
 
 
+TDX_TIMEOUT: float = GAME_CONFIG.get("tdx_timeout", 10.0)
+"""The timeout (second) of every request to TDX when refreshing the metro data. Default is 10.0."""
+
+
 API_URL_TP = r"https://tdx.transportdata.tw/api/basic/v2/Rail/Metro/StationOfLine/TRTC?%24top=10000&%24format=JSON"  # 北捷站點資料
 LOCATION_API_URL_TP = r"https://tdx.transportdata.tw/api/basic/v2/Rail/Metro/Station/TRTC?%24top=10000&%24format=JSON"  # 北捷站點位置
 API_URL_NTP = r"https://tdx.transportdata.tw/api/basic/v2/Rail/Metro/StationOfLine/NTMC?%24top=10000&%24format=JSON"  # 環狀線站點資料
@@ -1,4 +1,36 @@
 from flask_sqlalchemy import SQLAlchemy
 
 
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+
+
+def bulk_upsert(model: type[db.Model], rows: list[dict], key: str="name") -> None:
+    """
+    Insert the new rows and update the existing rows in bulk, without committing.
+    
+    Parameters
+    ----------
+    model: :class:`db.Model`
+        The model of the table.
+        
+    rows: :type:`list[dict]`
+        The rows to write, every row must have the same keys.
+        
+    key: :type:`str`
+        The unique column to match the existing rows.
+    """
+    
+    if not rows:
+        return None
+    
+    table = model.__table__
+    existing = set(db.session.execute(db.select(table.c[key])).scalars())
+    
+    new_rows = [row for row in rows if row[key] not in existing]
+    old_rows = [{f"_{key}": row[key], **row} for row in rows if row[key] in existing]
+    
+    if new_rows:
+        db.session.execute(table.insert(), new_rows)
+        
+    if old_rows:
+        db.session.execute(table.update().where(table.c[key] == db.bindparam(f"_{key}")), old_rows)
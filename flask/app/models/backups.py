@@ -0,0 +1,40 @@
+from . import db
+
+
+class Backups(db.Model):
+    __tablename__ = "backups"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    version = db.Column(db.BigInteger, nullable=False) # 備份的快照的狀態版本
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+
+    def __repr__(self):
+        return f"<Backup {self.version}>"
+
+
+def load_backup_version() -> int | None:
+    """The state version of the last backup, or `None` if it was never backed up."""
+
+    backup = db.session.get(Backups, 1)
+
+    return backup.version if backup is not None else None
+
+
+def save_backup_version(version: int) -> None:
+    """
+    Record the state version of the backup, without committing. \\
+    Saved in the same transaction as the backup, so the changes replayed after it are never applied twice.
+
+    Parameters
+    ----------
+    version: :type:`int`
+        The state version of the saved snapshot.
+    """
+
+    backup = db.session.get(Backups, 1)
+
+    if backup is None:
+        db.session.add(Backups(id=1, version=version))
+    else:
+        backup.version = version
@@ -0,0 +1,152 @@
+import logging
+import pickle
+from typing import Any
+
+from . import db
+
+
+log = logging.getLogger(__name__)
+
+
+class TeamPointLog(db.Model):
+    __tablename__ = "team_point_log"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    team = db.Column(db.String(32), index=True, nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    point = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(256), nullable=False)
+    time = db.Column(db.String(32), nullable=False)
+
+    @staticmethod
+    def mapping(entry: dict) -> dict:
+        return {"point": entry["point"], "reason": entry["reason"], "time": entry["time"]}
+
+    def to_entry(self) -> dict:
+        return {"point": self.point, "reason": self.reason, "time": self.time}
+
+    def __repr__(self):
+        return f"<TeamPointLog {self.team} #{self.seq}>"
+
+
+class TeamEventLog(db.Model):
+    __tablename__ = "team_event_log"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    team = db.Column(db.String(32), index=True, nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    event = db.Column(db.String(256), nullable=False)
+    time = db.Column(db.String(32), nullable=False)
+
+    @staticmethod
+    def mapping(entry: dict) -> dict:
+        return {"event": entry["event"], "time": entry["time"]}
+
+    def to_entry(self) -> dict:
+        return {"event": self.event, "time": self.time}
+
+    def __repr__(self):
+        return f"<TeamEventLog {self.team} #{self.seq}>"
+
+
+class TeamStations(db.Model):
+    __tablename__ = "team_stations"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    team = db.Column(db.String(32), index=True, nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    station = db.Column(db.String(64), nullable=False)
+    owned = db.Column(db.Boolean, default=False) # False: 經過的站點, True: 佔領的站點
+
+    @staticmethod
+    def mapping(entry: str) -> dict:
+        return {"station": entry}
+
+    def to_entry(self) -> str:
+        return self.station
+
+    def __repr__(self):
+        return f"<TeamStations {self.team} #{self.seq}, Owned: {self.owned}>"
+
+
+LOG_TABLES: dict[str, tuple[type[db.Model], dict[str, Any]]] = {
+    "point_log": (TeamPointLog, {}),
+    "event_log": (TeamEventLog, {}),
+    "stations": (TeamStations, {"owned": False}),
+    "owned_stations": (TeamStations, {"owned": True}),
+}
+"""The append-only table and the filter of every list attribute of :class:`Team`."""
+
+
+def load_team_logs() -> dict[str, dict[str, list]]:
+    """
+    Load every list attribute in `LOG_TABLES` of every team.
+
+    Returns
+    -------
+    logs: :type:`dict[str, dict[str, list]]`
+        `{team name: {attribute: entries}}`
+    """
+
+    logs: dict[str, dict[str, list]] = {}
+
+    for field, (model, extra) in LOG_TABLES.items():
+        for row in model.query.filter_by(**extra).order_by(model.team, model.seq):
+            logs.setdefault(row.team, {}).setdefault(field, []).append(row.to_entry())
+
+    return logs
+
+
+def migrate_legacy_logs() -> int:
+    """
+    Move the list attributes of the old database, pickled in the columns of `teams`, to the tables in `LOG_TABLES`. \\
+    Only the teams without any entry in the table are moved, and the old columns are cleared, \\
+    so it runs only once and a reset log is never loaded again.
+
+    Returns
+    -------
+    count: :type:`int`
+        The number of moved entries.
+    """
+
+    columns = {column["name"] for column in db.inspect(db.engine).get_columns("teams")}
+    fields = [field for field in LOG_TABLES.keys() if field in columns]
+
+    if not fields:
+        return 0
+
+    teams = db.table("teams", db.column("name"), *(db.column(field) for field in fields))
+    count = 0
+    legacy = False
+
+    for row in db.session.execute(db.select(teams)).mappings():
+        for field in fields:
+            if row[field] is None:
+                continue
+
+            legacy = True
+
+            model, extra = LOG_TABLES[field]
+            entries = pickle.loads(row[field])
+
+            # 已有新資料表的紀錄時以新資料表為準
+            if entries and not db.session.query(model.query.filter_by(team=row["name"], **extra).exists()).scalar():
+                db.session.execute(db.insert(model), [
+                    {"team": row["name"], "seq": seq, **extra, **model.mapping(entry)}
+                    for seq, entry in enumerate(entries)
+                ])
+                count += len(entries)
+
+    if not legacy:
+        return 0
+
+    db.session.execute(db.update(teams).values({field: None for field in fields}))
+    db.session.commit()
+
+    if count:
+        log.info(f"Moved {count} entries from the old columns of teams.")
+
+    return count
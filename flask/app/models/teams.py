@@ -18,18 +18,15 @@ class Teams(db.Model):
     location = db.Column(db.String(64), default="")
     target_location = db.Column(db.String(64), default="")
 
-    point_log = db.Column(db.PickleType(), default=[])
-    event_log = db.Column(db.PickleType(), default=[])
+    # point_log, event_log, stations, owned_stations 存在 team_logs 的 append-only 資料表
     step = db.Column(db.Integer, default=0)
 
     current_mission_finished = db.Column(db.Boolean, default=True)
     current_card = db.Column(db.String(64), nullable=True)
 
-    imprisoned_time = db.Column(db.Integer, default=0)
+    imprisoned_time = db.Column(db.Integer, default=0) # 出獄時間 (unix timestamp，秒)
     is_imprisoned = db.Column(db.Boolean, default=False)
 
-    stations = db.Column(db.PickleType(), default=[])
-    owned_stations = db.Column(db.PickleType(), default=[])
     combos = db.Column(db.PickleType(), default=[])
     choice = db.Column(db.PickleType(), default=[])
 
@@ -43,8 +40,6 @@ class Teams(db.Model):
         self.players = team.players if team.players is not None else []
         self.admins = team.admins if team.admins is not None else []
         
-        self.point_log: list[dict] = team.point_log if team.point_log is not None else [] # {"point": int, "reason": str, "time": str}
-        self.event_log: list[dict] = team.event_log if team.event_log is not None else [] # {"event": str, "time": str}
         self.point: int = team.point
         self.step: int = team.step
         
@@ -54,8 +49,6 @@ class Teams(db.Model):
         self.imprisoned_time: int = team.imprisoned_time
         self.is_imprisoned: bool = team.is_imprisoned
         
-        self.stations: list[str] = team.stations
-        self.owned_stations: list[str] = team.owned_stations
         self.combos: list[str] = team.combos
         self.choice: list[str] = team.choice
     
@@ -1,34 +1,29 @@
-from flask import session
-from zenora import APIClient
-
 from ..game_config import ADMINS
 from ..core import core
+from .identity import get_current_user
 
 
 def is_admin() -> bool:
-    if "token" in session:
-        bearer_client = APIClient(session.get("token"), bearer=True)
-        current_user = bearer_client.users.get_current_user()
+    current_user = get_current_user()
+    if current_user is not None:
         _, output = core.check_player(current_user.username)
         return output or (current_user.username in ADMINS)
     else:
         return False
-    
-    
+
+
 def is_player() -> bool:
-    if "token" in session:
-        bearer_client = APIClient(session.get("token"), bearer=True)
-        current_user = bearer_client.users.get_current_user()
+    current_user = get_current_user()
+    if current_user is not None:
         output, _ = core.check_player(current_user.username)
         return (output is not None) or (current_user.username in ADMINS)
     else:
         return False
-    
+
 
 def is_game_admin() -> bool:
-    if "token" in session:
-        bearer_client = APIClient(session.get("token"), bearer=True)
-        current_user = bearer_client.users.get_current_user()
+    current_user = get_current_user()
+    if current_user is not None:
         return current_user.username in ADMINS
     else:
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,120 @@
+import time
+import logging
+from threading import Lock
+from typing import Any, Optional
+
+from flask import g, session
+from zenora import APIClient
+
+from ..game_config import IDENTITY_CACHE_TTL
+
+
+log = logging.getLogger(__name__)
+
+
+class IdentityCache:
+    """
+    Cache the discord user of every login token, so a request doesn't need to ask discord again.
+
+    Properties
+    ----------
+    ttl: :type:`int`
+        The time (second) to keep a cached user.
+    """
+
+    def __init__(self, ttl: int=IDENTITY_CACHE_TTL) -> None:
+        self.ttl = ttl
+        self._users: dict[str, tuple[float, Any]] = {} # {token: (expire_time, user)}
+        self._lock = Lock()
+
+
+    def get(self, token: str) -> Any:
+        """
+        Get the discord user of the token, ask discord only if the cache is missed or expired.
+
+        Parameters
+        ----------
+        token: :type:`str`
+            The oauth access token.
+
+        Returns
+        -------
+        user: :class:`zenora.OwnUser`
+            The discord user.
+        """
+
+        cached = self._users.get(token)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        user = APIClient(token, bearer=True).users.get_current_user()
+        self.set(token, user)
+
+        log.debug(f"Resolved user {user.username} from discord.")
+
+        return user
+
+
+    def set(self, token: str, user: Any) -> None:
+        """
+        Cache the discord user of the token.
+
+        Parameters
+        ----------
+        token: :type:`str`
+            The oauth access token.
+
+        user: :class:`zenora.OwnUser`
+            The discord user.
+        """
+
+        now = time.monotonic()
+
+        with self._lock:
+            # 順便清掉過期的token
+            for expired in [t for t, (expire_time, _) in self._users.items() if expire_time <= now]:
+                del self._users[expired]
+
+            self._users[token] = (now + self.ttl, user)
+
+
+    def invalidate(self, token: Optional[str]) -> None:
+        """
+        Remove the token from the cache, e.g. when the user logs out.
+
+        Parameters
+        ----------
+        token: :type:`str`
+            The oauth access token.
+        """
+
+        with self._lock:
+            self._users.pop(token, None)
+
+
+    def clear(self) -> None:
+        """Remove all cached users."""
+
+        with self._lock:
+            self._users.clear()
+
+
+identity_cache = IdentityCache()
+
+
+def get_current_user() -> Optional[Any]:
+    """
+    Get the discord user of the current request. \\
+    The user is resolved only once per request and stored in `flask.g`.
+
+    Returns
+    -------
+    user: :class:`zenora.OwnUser` | :type:`None`
+        The discord user, or `None` if not logged in.
+    """
+
+    if "current_user" not in g:
+        token = session.get("token")
+        g.current_user = identity_cache.get(token) if token is not None else None
+
+    return g.current_user
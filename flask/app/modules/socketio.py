@@ -1,7 +1,9 @@
 import logging
+from flask import request
 from flask_socketio import SocketIO
 
 from ..core import core
+from .identity import get_current_user
 
 
 log = logging.getLogger(__name__)
@@ -11,4 +13,16 @@ socketio = SocketIO(cors_allowed_origins="*", allow_upgrades=False)
 @socketio.on("Connect")
 def connect(data):
     log.info(data["message"])
-    socketio.emit("Connected", {"message": "Connected from server"})
\ No newline at end of file
+    
+    # 依照玩家身分加入房間，之後只推送有變動的資料，隊伍變動時core會更新房間
+    current_user = get_current_user()
+    if current_user is not None:
+        core.check_player(current_user.username)
+        core.connect_player(current_user.username, request.sid)
+    
+    socketio.emit("Connected", {"message": "Connected from server"})
+    
+    
+@socketio.on("disconnect")
+def disconnect():
+    core.disconnect_player(request.sid)
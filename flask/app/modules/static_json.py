@@ -0,0 +1,136 @@
+import gzip
+import hashlib
+import json
+import logging
+from threading import Lock
+from typing import Any
+
+from flask import request, Response
+
+
+log = logging.getLogger(__name__)
+
+GZIP_MIN_SIZE = 1024
+"""The smallest body (byte) worth a gzip variant."""
+
+
+class StaticJSON:
+    """
+    A json response encoded only once, for the game data that doesn't change between requests. \\
+    The body, its gzip variant and their strong ETags are prepared in advance, \\
+    so a request only picks a variant or answers `304` without a body.
+
+    Properties
+    ----------
+    body: :type:`bytes`
+        The encoded json.
+
+    etag: :type:`str`
+        The strong ETag of `body`.
+
+    gzip_body: :type:`bytes` | :type:`None`
+        The gzip variant of `body`, `None` if the body is too small to be worth it.
+
+    gzip_etag: :type:`str` | :type:`None`
+        The strong ETag of `gzip_body`.
+    """
+
+    def __init__(self, data: Any, indent: int | None=None) -> None:
+        separators = None if indent is not None else (",", ":")
+        self.body = json.dumps(data, ensure_ascii=False, indent=indent, separators=separators).encode("utf-8")
+        self.etag = hashlib.blake2b(self.body, digest_size=16).hexdigest()
+
+        self.gzip_body: bytes | None = None
+        self.gzip_etag: str | None = None
+
+        if len(self.body) >= GZIP_MIN_SIZE:
+            compressed = gzip.compress(self.body, compresslevel=9, mtime=0)
+            if len(compressed) < len(self.body):
+                self.gzip_body = compressed
+                # 不同編碼是不同的表示，ETag也要不同
+                self.gzip_etag = self.etag + "-gz"
+
+
+    def response(self, private: bool=False, download_name: str | None=None) -> Response:
+        """
+        Make the response of the current request. \\
+        The gzip variant is sent if the client accepts it, and `304` is sent if `If-None-Match` matches.
+
+        Parameters
+        ----------
+        private: :type:`bool`
+            If the data is only for logged in players, so shared caches must not keep it.
+
+        download_name: :type:`str` | :type:`None`
+            Send the json as an attachment with this filename.
+
+        Returns
+        -------
+        response: :class:`Response`
+            The response.
+        """
+
+        if self.gzip_body is not None and "gzip" in request.accept_encodings:
+            response = Response(self.gzip_body, mimetype="application/json")
+            response.content_encoding = "gzip"
+            response.set_etag(self.gzip_etag)
+        else:
+            response = Response(self.body, mimetype="application/json")
+            response.set_etag(self.etag)
+
+        response.vary.add("Accept-Encoding")
+
+        # 每次都向伺服器確認，內容沒變時只回傳304
+        response.cache_control.no_cache = True
+        if private:
+            response.cache_control.private = True
+        else:
+            response.cache_control.public = True
+
+        if download_name is not None:
+            response.headers.set("Content-Disposition", "attachment", filename=download_name)
+
+        return response.make_conditional(request)
+
+
+_responses: dict[str, tuple[Any, StaticJSON]] = {} # {name: (data, encoded)}
+_lock = Lock()
+
+
+def static_json(name: str, data: Any, indent: int | None=None) -> StaticJSON:
+    """
+    Get the encoded json of the data, encode it again only if the data is replaced by another object.
+
+    Parameters
+    ----------
+    name: :type:`str`
+        The unique name of the response. e.g. `"graph"`
+
+    data: :type:`Any`
+        The data, it must not be modified in place after it is encoded.
+
+    indent: :type:`int` | :type:`None`
+        The indent of the json, `None` for the compact json.
+
+    Returns
+    -------
+    encoded: :class:`StaticJSON`
+        The encoded json.
+    """
+
+    cached = _responses.get(name)
+    if cached is not None and cached[0] is data:
+        return cached[1]
+
+    with _lock:
+        cached = _responses.get(name)
+        if cached is not None and cached[0] is data:
+            return cached[1]
+
+        # 保留資料的參照，避免id被其他物件重複使用
+        encoded = StaticJSON(data, indent)
+        _responses[name] = (data, encoded)
+
+    log.debug(f"Encoded the {name} response ({len(encoded.body)} bytes).")
+
+    return encoded
@@ -1,10 +1,9 @@
+// 所有隊伍的資料，載入時抓取一次，之後由 socket 推送的變動更新 (見 socket.js)
+let teamsState = [];
+
 // ready
 document.addEventListener("DOMContentLoaded", () => {
-    showMap();
-    showCollapse_time();
-    showPoint();
-    showLocate();
-    showImprisoned();
+    syncState();
     showPointchart();
     // showDistance();
     resizeMap();
@@ -13,13 +12,82 @@ document.addEventListener("DOMContentLoaded", () => {
     window.addEventListener('scroll', resizeMap);
 });
 
-// repeat
-setInterval(showMap, 10000);
-setInterval(showCollapse_time, 10000);
-setInterval(showPoint, 10000);
-setInterval(showLocate, 10000);
-setInterval(showImprisoned, 10000);
-// setInterval(showDistance,10000);
+
+// 重新抓取完整資料，用於載入、重新連線及伺服器要求同步時
+async function syncState() {
+    try {
+        const [teams, collapse, next_time] = await Promise.all([
+            fetch(`/api/teams`).then(response => response.json()),
+            fetch(`/api/collapse_status`).then(response => response.json()),
+            fetch(`/api/next_collapse_time`).then(response => response.json())
+        ]);
+
+        teamsState = teams;
+        renderTeams();
+        updateCollapse({...collapse, next_time: next_time});
+    } catch (error) {
+        console.error('Error fetching data:', error);
+    }
+}
+
+// socket 事件 team_update: 只包含有變動的公開欄位及紀錄數量
+function updateTeam(data) {
+    const team = teamsState.find(t => t.name === data.name);
+    if (!team) {
+        syncState();
+        return;
+    }
+
+    // 紀錄不保存在本地，點開時再由 fetchLog 抓取
+    const { new_point_log, new_event_log, point_log, event_log, ...fields } = data;
+    Object.assign(team, fields);
+    if (point_log) team.point_log_count = point_log.length;
+    if (event_log) team.event_log_count = event_log.length;
+    if (new_point_log) team.point_log_count += new_point_log.length;
+    if (new_event_log) team.event_log_count += new_event_log.length;
+
+    renderTeams();
+}
+
+// socket 事件 team_detail: 只推送給隊伍本身及管理員，包含卡片及選項等不公開的欄位
+function updateTeamDetail(data) {
+    const team = teamsState.find(t => t.name === data.name);
+    if (!team) {
+        syncState();
+        return;
+    }
+
+    // 紀錄數量由同時推送的 team_update 更新，避免重複計算
+    const { new_point_log, new_event_log, point_log, event_log, ...fields } = data;
+    Object.assign(team, fields);
+
+    renderTeams();
+}
+
+// socket 事件 collapse_status
+function updateCollapse(data) {
+    showMap(data);
+    showCollapse_time(data.next_time);
+}
+
+// 逐頁抓取隊伍的完整紀錄 (point_log 或 event_log)
+async function fetchLog(team_name, kind) {
+    let entries = [];
+    let cursor = 0;
+    while (cursor !== null) {
+        const response = await fetch(`/api/team/${team_name}/${kind}?cursor=${cursor}&limit=1000`);
+        const data = await response.json();
+        entries = entries.concat(data.entries);
+        cursor = data.next_cursor;
+    }
+    return entries;
+}
+
+function renderTeams() {
+    showPoint();
+    showLocate();
+    showImprisoned();
+}
 
 function resizeMap() {
     const img = document.querySelector('.MRT_map img[style*="display: block"]');
@@ -46,41 +114,33 @@ function resizeMap() {
 let lastStatus = null;
 let lastWarning = null;
 
-async function showMap() {
-    try {
-        const response = await fetch(`/api/collapse_status`);
-        const data = await response.json();
-
-        if (data.status !== lastStatus || data.warning !== lastWarning) {
-            lastStatus = data.status;
-            lastWarning = data.warning;
-            let images = document.querySelectorAll('.MRT_map img');
-            images.forEach(img => img.style.display = 'none');
-
-            if (data.warning === false) {
-                if (data.status === 0) {
-                    document.getElementById('Map0').style.display = 'block';
-                } else if (data.status === 1) {
-                    document.getElementById('Map2').style.display = 'block';
-                } else if (data.status === 2) {
-                    document.getElementById('Map4').style.display = 'block';
-                } else if (data.status === 3) {
-                    document.getElementById('Map6').style.display = 'block';
-                }
-            } else {
-                if (data.status === 0) {
-                    document.getElementById('Map1').style.display = 'block';
-                } else if (data.status === 1) {
-                    document.getElementById('Map3').style.display = 'block';
-                } else if (data.status === 2) {
-                    document.getElementById('Map5').style.display = 'block';
-                }
+function showMap(data) {
+    if (data.status !== lastStatus || data.warning !== lastWarning) {
+        lastStatus = data.status;
+        lastWarning = data.warning;
+        let images = document.querySelectorAll('.MRT_map img');
+        images.forEach(img => img.style.display = 'none');
+
+        if (data.warning === false) {
+            if (data.status === 0) {
+                document.getElementById('Map0').style.display = 'block';
+            } else if (data.status === 1) {
+                document.getElementById('Map2').style.display = 'block';
+            } else if (data.status === 2) {
+                document.getElementById('Map4').style.display = 'block';
+            } else if (data.status === 3) {
+                document.getElementById('Map6').style.display = 'block';
+            }
+        } else {
+            if (data.status === 0) {
+                document.getElementById('Map1').style.display = 'block';
+            } else if (data.status === 1) {
+                document.getElementById('Map3').style.display = 'block';
+            } else if (data.status === 2) {
+                document.getElementById('Map5').style.display = 'block';
             }
         }
     }
-    catch (error){
-        console.error('Error fetching data:', error);
-    }
 }
 
 
@@ -167,87 +227,77 @@ async function station_info(station_name) {
 
 const chineseNumerals = { '零': 0, '一': 1, '二': 2, '三': 3, '四': 4, '五': 5, };
 
-async function showLocate() {
-    try {
-        const response = await fetch(`/api/teams`);
-        const data = await response.json();
-
-        data.forEach(team => {
-            // 提取隊名中的數字部分，例如 "零小" -> "0"
-            const chineseNumeral = team.name.charAt(0); // 假設隊名的第一個字符是中文數字
-            const teamNumber = chineseNumerals[chineseNumeral];
-
-            if (teamNumber !== undefined) {
-                const locationElement = document.getElementById(`team${teamNumber}_location`);
-                if (locationElement) {
-                    if (team.is_imprisoned) {
-                        locationElement.textContent = `監獄⛓️`;
+function showLocate() {
+    teamsState.forEach(team => {
+        // 提取隊名中的數字部分，例如 "零小" -> "0"
+        const chineseNumeral = team.name.charAt(0); // 假設隊名的第一個字符是中文數字
+        const teamNumber = chineseNumerals[chineseNumeral];
+
+        if (teamNumber !== undefined) {
+            const locationElement = document.getElementById(`team${teamNumber}_location`);
+            if (locationElement) {
+                if (team.is_imprisoned) {
+                    locationElement.textContent = `監獄⛓️`;
+                } else {
+                    if (team.location === team.target_location && team.target_location !== null) {
+                        locationElement.textContent = `${team.location}`;
                     } else {
-                        if (team.location === team.target_location && team.target_location !== null) {
-                            locationElement.textContent = `${team.location}`;
-                        } else {
-                            locationElement.textContent = `${team.location} -> ${team.target_location}`;
-                        }
+                        locationElement.textContent = `${team.location} -> ${team.target_location}`;
                     }
                 }
             }
-        });
-    } catch (error) {
-        console.error('Error fetching data:', error);
-    }
+        }
+    });
 }
 
-async function showPoint() {
-    try {
-        const response = await fetch(`/api/teams`);
-        const data = await response.json();
-        const teams = document.querySelectorAll(".team");
-        const maxScore = 1000;
+function showPoint() {
+    const teams = document.querySelectorAll(".team");
+    const maxScore = 1000;
 
-        data.forEach(teamData => {
-            const chineseNumeral = teamData.name.charAt(0); // 假設隊名的第一個字符是中文數字
-            const teamNumber = chineseNumerals[chineseNumeral];
+    teamsState.forEach(teamData => {
+        const chineseNumeral = teamData.name.charAt(0); // 假設隊名的第一個字符是中文數字
+        const teamNumber = chineseNumerals[chineseNumeral];
 
-            if (teamNumber !== undefined && teams[teamNumber]) {
-                const teamElement = teams[teamNumber];
-                const score = teamData.point;
-                const progressBar = teamElement.querySelector(".progress");
-                const scoreElement = teamElement.querySelector(".score");
+        if (teamNumber !== undefined && teams[teamNumber]) {
+            const teamElement = teams[teamNumber];
+            const score = teamData.point;
+            const progressBar = teamElement.querySelector(".progress");
+            const scoreElement = teamElement.querySelector(".score");
 
-                teamElement.setAttribute("data-score", score);
+            teamElement.setAttribute("data-score", score);
 
-                const widthPercent = (score / maxScore) * 100;
-                progressBar.style.width = widthPercent + "%";
+            const widthPercent = (score / maxScore) * 100;
+            progressBar.style.width = widthPercent + "%";
 
-                scoreElement.textContent = `${score} 分`;
-            }
-        });
-    } catch (error) {
-        console.error('Error fetching data:', error);
-    }
+            scoreElement.textContent = `${score} 分`;
+        }
+    });
 }
 
 
-async function showCollapse_time() {
-    try {
-        const response = await fetch(`/api/next_collapse_time`);
-        const data = await response.json();
-        const targetTime = parseTime(data);
-        const interval = setInterval(() => {
-            const now = new Date();
-            const timeDiff = targetTime - now;
-
-            if (timeDiff <= 0) {
-                clearInterval(interval);
-                document.getElementById('next_collapse_time_label').textContent = '載入中...';
-            } else {
-                const countdown = formatTimeDiff(timeDiff);
-                document.getElementById('next_collapse_time_label').textContent = `崩塌倒數 : ${countdown}`;
-            }
-        }, 1000);
-    } catch (error) {
-        console.error('Error fetching data:', error);
+let collapseCountdown = null;
+
+function showCollapse_time(next_time) {
+    clearInterval(collapseCountdown);
+
+    if (next_time === null || next_time === undefined) {
+        document.getElementById('next_collapse_time_label').textContent = '';
+        return;
     }
+
+    const targetTime = parseTime(next_time);
+    collapseCountdown = setInterval(() => {
+        const now = new Date();
+        const timeDiff = targetTime - now;
+
+        if (timeDiff <= 0) {
+            clearInterval(collapseCountdown);
+            document.getElementById('next_collapse_time_label').textContent = '載入中...';
+        } else {
+            const countdown = formatTimeDiff(timeDiff);
+            document.getElementById('next_collapse_time_label').textContent = `崩塌倒數 : ${countdown}`;
+        }
+    }, 1000);
 }
 
 function parseTime(timeString) {
@@ -273,17 +323,32 @@ function formatTimeDiff(timeDiff) {
 }
 
 
-async function showImprisoned() {
+let imprisonedCountdown = null;
+
+function showImprisoned() {
+    clearInterval(imprisonedCountdown);
+
     const team = document.querySelector('#team').innerHTML;
-    try {
-        const response = await fetch(`/api/team/${team}`);
-        const data = await response.json();
-        if (data.is_imprisoned) {
-            document.getElementById('is_imprisoned_label').textContent = `監獄剩餘時間 : ${data.imprisoned_time} 分鐘`;
-        }
-    } catch (error) {
-        console.error('Error fetching data:', error);
+    const data = teamsState.find(t => t.name === team);
+    if (!data || !data.is_imprisoned) {
+        document.getElementById('is_imprisoned_label').textContent = '';
+        return;
     }
+
+    // imprisoned_time 是出獄時間 (秒)，出獄時伺服器會推送 team_update
+    const updateLabel = () => {
+        const timeDiff = data.imprisoned_time * 1000 - Date.now();
+
+        if (timeDiff <= 0) {
+            clearInterval(imprisonedCountdown);
+            document.getElementById('is_imprisoned_label').textContent = '載入中...';
+        } else {
+            document.getElementById('is_imprisoned_label').textContent = `監獄剩餘時間 : ${formatTimeDiff(timeDiff)}`;
+        }
+    };
+
+    updateLabel();
+    imprisonedCountdown = setInterval(updateLabel, 1000);
 }
 
 
@@ -357,17 +422,8 @@ async function showImprisoned() {
 // }
 
 
-document.addEventListener("DOMContentLoaded", async function() {
-    let teamsData = [];
-
-    try {
-        const response = await fetch('/api/teams');
-        const data = await response.json();
-        teamsData = data;
-        setupEventListeners();
-    } catch (error) {
-        console.error('Error fetching teams data:', error);
-    }
+document.addEventListener("DOMContentLoaded", function() {
+    setupEventListeners();
 
     function setupEventListeners() {
         for (let i = 0; i <= 5; i++) {
@@ -378,14 +434,14 @@ document.addEventListener("DOMContentLoaded", async function() {
                 point_log_alert(this.textContent);
             });
             document.getElementById(`team${i}_location`).addEventListener("click", function() {
-                event_log_alert(teamsData, i);
+                event_log_alert(teamsState, i);
             });
         }
     }
     
     function owned_stations_alert(team) {
         const team_name = team.replace(':', '').trim();
-        const teamData = teamsData.find(t => t.name === team_name);
+        const teamData = teamsState.find(t => t.name === team_name);
 
         if (teamData) {
             const stationsList = teamData.owned_stations.length > 0 ? teamData.owned_stations.join(', ') : '無';
@@ -404,13 +460,14 @@ document.addEventListener("DOMContentLoaded", async function() {
     }
 
 
-    function point_log_alert(team) {
+    async function point_log_alert(team) {
         const team_name = team.replace(':', '').trim();
-        const teamData = teamsData.find(t => t.name === team_name);
+        const teamData = teamsState.find(t => t.name === team_name);
 
         if (teamData) {
-            const point_log = teamData.point_log.length > 0 
-                ? teamData.point_log.map(log => `${log.point} 分 - ${log.reason} (${log.time})`).join('<br>') 
+            const logs = await fetchLog(team_name, 'point_log');
+            const point_log = logs.length > 0 
+                ? logs.map(log => `${log.point} 分 - ${log.reason} (${log.time})`).join('<br>') 
                 : '無';
             Swal.fire({
                 title: `${team_name} 分數紀錄`,
@@ -430,13 +487,14 @@ document.addEventListener("DOMContentLoaded", async function() {
         }
     }
 
-    function event_log_alert(teamsData, teamIndex) {
+    async function event_log_alert(teamsData, teamIndex) {
         team_name = document.getElementById(`team${teamIndex}_location_lebel`).textContent;
         team_name = team_name.replace(':', '').trim();
         const teamData = teamsData.find(t => t.name === team_name);
         if (teamData) {
-            const event_log = teamData.event_log.length > 0 
-                ? teamData.event_log.map(log => `${log.time} ${log.event}`).join('<br>') 
+            const logs = await fetchLog(team_name, 'event_log');
+            const event_log = logs.length > 0 
+                ? logs.map(log => `${log.time} ${log.event}`).join('<br>') 
                 : '無';
             Swal.fire({
                 title: `${team_name} 路徑/事件紀錄`,
@@ -460,7 +518,7 @@ document.addEventListener("DOMContentLoaded", async function() {
 
 async function showPointchart() {
     try {
-        const response = await fetch('/api/teams');
+        const response = await fetch('/api/teams?logs=1');
         const teamsData = await response.json();
         const allTimes = Array.from(new Set(teamsData.flatMap(teamData => teamData.point_log.map(log => log.time)))).sort();
         const datasets = teamsData
@@ -2,9 +2,20 @@ document.addEventListener("DOMContentLoaded", () => {
     team_list();
     unknow_user_list();
 });
-// repeat
-setInterval(team_list, 10000);
-setInterval(unknow_user_list, 10000);
+
+// socket 事件 team_update (見 socket.js)，只在隊員或初始站點變動時重新載入
+function updateTeam(data) {
+    const team = document.getElementById('team').textContent;
+    if (data.name === team && ('players' in data || 'admins' in data || 'start_location_defined' in data)) {
+        team_list();
+    }
+}
+
+// 重新連線後重新載入
+function syncState() {
+    team_list();
+    unknow_user_list();
+}
 
 function team_list() {
     const team = document.getElementById('team').textContent;
@@ -116,24 +127,27 @@ function add_point() {
 function unknow_user_list() {
     fetch('/api/users')
     .then(response => response.json())
-    .then(data => {
-        const userList = document.getElementById('unknow_user_list');
-        userList.innerHTML = ''; 
-
-        data.forEach(user => {
-            const listItem = document.createElement('li');
-            listItem.textContent = user;
-            
-            listItem.addEventListener('click', () => {
-                navigator.clipboard.writeText(user)
-                    .then(() => alert(`Copied: ${user}`))
-                    .catch(err => console.error('Failed to copy text:', err));
-            });
-
-            userList.appendChild(listItem);
-        });
-    })
+    .then(updateUnknownPlayers)
     .catch(error => {
         console.error('Error fetching user data:', error);
     });
 }
+
+// socket 事件 unknown_players
+function updateUnknownPlayers(data) {
+    const userList = document.getElementById('unknow_user_list');
+    userList.innerHTML = ''; 
+
+    data.forEach(user => {
+        const listItem = document.createElement('li');
+        listItem.textContent = user;
+        
+        listItem.addEventListener('click', () => {
+            navigator.clipboard.writeText(user)
+                .then(() => alert(`Copied: ${user}`))
+                .catch(err => console.error('Failed to copy text:', err));
+        });
+
+        userList.appendChild(listItem);
+    });
+}
@@ -2,15 +2,44 @@ document.addEventListener('DOMContentLoaded', (event) => {
 
     const socket = io.connect(location.href);
 
-    socket.emit('Connect', {message: "Connected from client"});
+    // 每次 (重新) 連線都需重新加入房間
+    socket.on('connect', () => {
+        socket.emit('Connect', {message: "Connected from client"});
+    });
+
+    // 斷線期間可能漏掉推送，重新連線後抓取完整資料
+    socket.io.on('reconnect', () => {
+        if (typeof syncState === 'function') syncState();
+    });
+
+    socket.on('sync', () => {
+        if (typeof syncState === 'function') syncState();
+    });
+
+    socket.on('team_update', (data) => {
+        if (typeof updateTeam === 'function') updateTeam(data);
+    });
+
+    // 自己隊伍 (管理員則是所有隊伍) 的完整變動，包含卡片及選項
+    socket.on('team_detail', (data) => {
+        if (typeof updateTeamDetail === 'function') updateTeamDetail(data);
+    });
+
+    socket.on('collapse_status', (data) => {
+        if (typeof updateCollapse === 'function') updateCollapse(data);
+    });
+
+    socket.on('unknown_players', (players) => {
+        if (typeof updateUnknownPlayers === 'function') updateUnknownPlayers(players);
+    });
 
     socket.on('Connected', (data) => {
         // console.log(data["message"]);
     });
 
 
-    socket.on('collapse_damage', (team_name) => {
-        if(team_name === document.querySelector('#team').innerHTML){
+    socket.on('collapse_damage', (team_names) => {
+        if(team_names.includes(document.querySelector('#team').innerHTML)){
             Swal.fire({
                 title: '崩塌傷害',
                 icon: 'warning',
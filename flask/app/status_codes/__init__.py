@@ -5,6 +5,9 @@ import json
 from ..game_config import LANGUAGE
 
 
+_localizations: dict[str, dict[str, str]] = {} # {language: {code: message}}
+
+
 class StatusCodes:
     S00000 = "Success"
     
@@ -54,18 +57,22 @@ class StatusCodes:
         if re.match(r"^[A-Za-z0-9-_]+$", language) is None:
             raise ValueError(self.S00008)
         
-        filename = language + ".json"
-        if not os.path.exists(os.path.join(os.path.dirname(__file__), filename)):
-            raise FileNotFoundError(self.S90001)
+        # 語系檔不會在執行中改變，每種語言只讀取一次
+        data = _localizations.get(language)
         
-        with open(os.path.join(os.path.dirname(__file__), filename), "r", encoding="utf-8") as f:
-            data: dict[str, str] = json.load(f)
+        if data is None:
+            filename = language + ".json"
+            if not os.path.exists(os.path.join(os.path.dirname(__file__), filename)):
+                raise FileNotFoundError(self.S90001)
+            
+            with open(os.path.join(os.path.dirname(__file__), filename), "r", encoding="utf-8") as f:
+                data = _localizations[language] = json.load(f)
             
-            if is_return:
-                return data
-            else:
-                for code, message in data.items():
-                    setattr(self, code, message)
+        if is_return:
+            return data
+        else:
+            for code, message in data.items():
+                setattr(self, code, message)
                 
                 
 STATUS_CODES = StatusCodes(LANGUAGE)
\ No newline at end of file
@@ -4,6 +4,7 @@ from zenora import APIClient
 
 from  ..config import OAUTH_URL, REDIRECT_URI, CLIENT_SECRET, TOKEN
 from .api import core
+from ..modules.identity import identity_cache
 
 
 log = logging.getLogger(__name__)
@@ -19,6 +20,7 @@ def callback():
         bearer_client = APIClient(access_token, bearer=True)
         current_user = bearer_client.users.get_current_user()
         session["token"] = access_token
+        identity_cache.set(access_token, current_user)
         session.permanent = True
         _, is_admin = core.check_player(current_user.username)
         
@@ -39,5 +41,6 @@ def login():
 
 @account_sys.route("/logout")
 def logout():
+    identity_cache.invalidate(session.get("token"))
     session.clear()
     return redirect("/")
\ No newline at end of file
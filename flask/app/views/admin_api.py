@@ -1,12 +1,14 @@
 import logging
 from logging import INFO
-from flask import abort, Blueprint, session, request
-from zenora import APIClient
+from flask import abort, Blueprint, jsonify, request
 
 from ..core import core
 from ..modules.checker import is_admin, is_game_admin
+from ..modules.identity import get_current_user
 from ..status_codes import STATUS_CODES
 from ..models import db
+from ..data import reload_data
+from ..core.metro import refresh_snapshot_background
 
 
 log = logging.getLogger(__name__)
@@ -18,13 +20,9 @@ reset_text_color = "\33[0m"
 
 @admin_api.before_request
 def log_user():
-
-    if request.endpoint == "admin_api.save_game_auto":
-        return
     
-    if "token" in session:
-        bearer_client = APIClient(session.get("token"), bearer=True)
-        current_user = bearer_client.users.get_current_user()
+    current_user = get_current_user()
+    if current_user is not None:
         log.log(INFO, f"{yellow_text_color}User \"{current_user.username}\" is using an admin api: \"{request.endpoint}\"{reset_text_color}")
 
 
@@ -96,7 +94,7 @@ def delete_team(name: str):
     if core.is_running is False:
         return STATUS_CODES.S99999
         
-    team = core.teams.pop(name, None)
+    team = core.delete_team(name)
     if team is None:
         return STATUS_CODES.S00004
     
@@ -115,10 +113,7 @@ def join_team(name: str, player_name: str):
     if name not in core.teams:
         return STATUS_CODES.S00004
 
-    core.teams[name].admins.append(player_name)
-    
-    if player_name in core.unknown_players: 
-        core.unknown_players.remove(player_name)
+    core.join_team(name, player_name, admin=True)
     
     return STATUS_CODES.S00000
 
@@ -129,18 +124,20 @@ def set_location(name: str, location: str):
     if not is_admin():
         abort(403)
                 
-    if core.is_running is False:
-        return STATUS_CODES.S99999
+    with core.lock():
+        if core.is_running is False:
+            return STATUS_CODES.S99999
         
-    if name not in core.teams:
-        return STATUS_CODES.S00004
+        if name not in core.teams:
+            return STATUS_CODES.S00004
         
-    if core.teams[name].is_imprisoned:
-        return STATUS_CODES.S20002
+        if core.teams[name].is_imprisoned:
+            return STATUS_CODES.S20002
     
-    core.teams[name].location = location.replace("_", "/")
+        core.teams[name].location = location.replace("_", "/")
+        core.notify_team(name, "location")
     
-    return STATUS_CODES.S00000
+        return STATUS_CODES.S00000
 
 @admin_api.route("/set_target_location/<name>/<location>")
 def set_target_location(name: str, location: str):
@@ -148,15 +145,17 @@ def set_target_location(name: str, location: str):
     if not is_admin():
         abort(403)
                 
-    if core.is_running is False:
-        return STATUS_CODES.S99999
+    with core.lock():
+        if core.is_running is False:
+            return STATUS_CODES.S99999
         
-    if name not in core.teams:
-        return STATUS_CODES.S00004
+        if name not in core.teams:
+            return STATUS_CODES.S00004
         
-    core.teams[name].target_location = location.replace("_", "/")
+        core.teams[name].target_location = location.replace("_", "/")
+        core.notify_team(name, "target_location")
     
-    return STATUS_CODES.S00000
+        return STATUS_CODES.S00000
 
 @admin_api.route("/imprison/<name>/<time>")
 def imprison(name: str, time: int):
@@ -170,8 +169,7 @@ def imprison(name: str, time: int):
     if name not in core.teams:
         return STATUS_CODES.S00004
         
-    core.teams[name].is_imprisoned = True
-    core.teams[name].imprisoned_time = time
+    core.imprison(name, int(time))
     
     log.debug(f"Team {name} is imprisoned by admin.")
     
@@ -190,7 +188,7 @@ def release_team(name: str):
     if name not in core.teams:
         return STATUS_CODES.S00004
         
-    core.teams[name].is_imprisoned = False
+    core.release(name)
     
     log.debug(f"Team {name} is released by admin.")
     
@@ -226,23 +224,26 @@ def finish_mission(name: str):
     if not is_admin():
         abort(403)
         
-    if core.is_running is False:
-        return STATUS_CODES.S99999
+    with core.lock():
+        if core.is_running is False:
+            return STATUS_CODES.S99999
     
-    if name not in core.teams:
-        return STATUS_CODES.S00004
+        if name not in core.teams:
+            return STATUS_CODES.S00004
     
-    if core.teams[name].current_mission_finished:
-        return STATUS_CODES.S50003
+        if core.teams[name].current_mission_finished:
+            return STATUS_CODES.S50003
     
-    if core.teams[name].is_imprisoned:
-        core.teams[name].is_imprisoned = False
+        if core.teams[name].is_imprisoned:
+            core.release(name)
     
-    if core.teams[name].target_location != core.teams[name].location:
-        core.teams[name].location = core.teams[name].target_location
+        if core.teams[name].target_location != core.teams[name].location:
+            core.teams[name].location = core.teams[name].target_location
+        
+        core.notify_team(name, "location")
     
-    card = core.finish_mission(name=name)
-    return STATUS_CODES.S00000 if card is None else card
+        card = core.finish_mission(name=name)
+        return STATUS_CODES.S00000 if card is None else card
 
 
 # @admin_api.route("/save_team")
@@ -296,6 +297,54 @@ def finish_mission(name: str):
 #     return STATUS_CODES.S00000
 
 
+@admin_api.route("/reload_data")
+def reload_data_files():
+    """
+    Reload the data files (e.g. `combo.json`) without restarting the server.
+    
+    Returns
+    -------
+    result: :type:`str`
+        The status code.
+        
+    Status Code
+    -----------
+    - S00000: The data files are reloaded successfully.
+    """
+    
+    if not is_game_admin():
+        abort(403)
+        
+    reload_data()
+    core.load_combos()
+    
+    return STATUS_CODES.S00000
+
+
+@admin_api.route("/refresh_metro")
+def refresh_metro():
+    """
+    Download the latest metro data from TDX in the background. \\
+    The new data is used from the next game.
+    
+    Returns
+    -------
+    result: :type:`str`
+        The status code.
+        
+    Status Code
+    -----------
+    - S00000: The refresh is started successfully.
+    """
+    
+    if not is_game_admin():
+        abort(403)
+        
+    refresh_snapshot_background()
+    
+    return STATUS_CODES.S00000
+
+
 @admin_api.route("/save_game")
 def save_game():
     """
@@ -424,33 +473,18 @@ def start_game():
     return STATUS_CODES.S00000
 
 
-@admin_api.route("/save_game_auto", methods=["GET"])
-def save_game_auto():
+@admin_api.route("/backup_status")
+def backup_status():
     """
-    Save the game automatically. This api is used by the backup scheduler. \\
-    The backup scheduler will send a request to this api every 3 minutes to save the game.
+    Get the metrics of the backups, see :attr:`Core.backup_metrics`.
     
     Returns
     -------
-    result: :type:`str`
-        The status code.
-        
-    Status Code
-    -----------
-    - S00000: The game is saved successfully.
-    - S99999: The game is not running.
+    data: :type:`dict`
+        The backup count, failures, time, duration (second) and written rows.
     """
     
-    if request.args.get("secret") != str(core.auto_backup_secret):
+    if not is_game_admin():
         abort(403)
         
-    if core.is_running is False:
-        return STATUS_CODES.S99999
-        
-    log.debug("Auto backup triggered.")
-
-    db.create_all()
-        
-    core.backup()
-    
-    return STATUS_CODES.S00000
\ No newline at end of file
+    return jsonify(core.backup_metrics)
\ No newline at end of file
@@ -1,13 +1,16 @@
-import pygeohash as pgh
+import json
 import logging
 from logging import INFO
-from flask import abort, Blueprint, jsonify, session
-from zenora import APIClient
+from flask import abort, Blueprint, jsonify, request, Response
 
 from ..core import core
+from ..core.team import Team, SECRET_FIELDS
 from ..config import RESET_TEXT_COLOR, YELLOW_TEXT_COLOR
 from ..modules.checker import is_admin, is_player
+from ..modules.identity import get_current_user
+from ..modules.static_json import static_json
 from ..data import load_data
+from ..game_config import LOG_PAGE_SIZE, MAX_LOG_PAGE_SIZE
 from ..status_codes import STATUS_CODES, LANGUAGE
 
 
@@ -19,65 +22,62 @@ api = Blueprint("api", __name__, url_prefix="/api")
 def status_codes_default():
     """Get status codes in default language."""
     
-    try: 
-        data = STATUS_CODES.localization(language=LANGUAGE, is_return=True)
-        return jsonify(data)
-    
-    except Exception as e:
-        abort(404)
+    return status_codes(LANGUAGE)
 
 
 @api.route("/status_codes/<language>")
 def status_codes(language: str):
-    """Get status codes in specified language."""
+    """Get status codes in specified language. Supports `If-None-Match`, 304 if nothing changed."""
     
     try: 
         data = STATUS_CODES.localization(language=language, is_return=True)
-        return jsonify(data)
     
     except Exception as e:
         abort(404)
+    
+    return static_json(f"status_codes:{language}", data).response()
 
 
 @api.route("/graph")
 def graph():
-    """Get the graph of the metro system."""
+    """Get the graph of the metro system. Supports `If-None-Match`, 304 if nothing changed."""
     
     if not is_player():
         abort(403)
     
-    return jsonify(core.metro.graph)
+    return static_json("graph", core.metro.graph).response(private=True)
+
+
+def _unlock_stations() -> set[str]:
+    
+    # 隊伍經過、所在及目標的站點可以看到隱藏站的任務
+    current_user = get_current_user()
+    if current_user is None:
+        return set()
+    
+    team, _ = core.check_player(current_user.username)
+    if team is None:
+        return set()
+    
+    return {*team.stations, team.target_location, team.location}
 
 
 @api.route("/stations")
 def stations():
-    """Get the `list` of stations."""
+    """Get the `list` of stations. Supports `If-None-Match`, 304 if the stations didn't change."""
     
     if not is_player():
         abort(403)
     
-    data = []
-    graph = core.metro.graph
-    unlock_stations = []
-    
-    if "token" in session:
-        bearer_client = APIClient(session.get("token"), bearer=True)
-        current_user = bearer_client.users.get_current_user()
-        team, _ = core.check_player(current_user.username)
-        if team is not None:
-            unlock_stations.extend(team.stations)
-            unlock_stations.append(team.target_location)
-            unlock_stations.append(team.location)
-    
-    for station_name in graph.keys():
-        station = core.metro.find_station(station_name)
-        data.append(station.__dict__.copy())
-        if station.hidden and (station_name not in unlock_stations):
-            data[-1]["mission"] = "隱藏"
-            data[-1]["tips"] = "隱藏"
-            data[-1]["exit"] = "隱藏"
+    payload, etag = core.metro.public_stations(_unlock_stations())
     
-    return jsonify(data)
+    # 內容沒變時只回傳304
+    response = Response(payload, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    
+    return response.make_conditional(request)
 
 
 @api.route("/station/<name>")
@@ -92,24 +92,8 @@ def station(name: str):
     if station is None:
         return jsonify({})
     
-    unlock_stations = []
-    
-    if "token" in session:
-        bearer_client = APIClient(session.get("token"), bearer=True)
-        current_user = bearer_client.users.get_current_user()
-        team, _ = core.check_player(current_user.username)
-        if team is not None:
-            unlock_stations.extend(team.stations)
-            unlock_stations.append(team.target_location)
-            unlock_stations.append(team.location)
-            log.debug(f"Unlock stations: {unlock_stations}")
-    
-    data = station.__dict__.copy()
+    data = station.to_public_dict(station.name in _unlock_stations())
     log.debug(f"Station: {data}")
-    if station.hidden and (station.name not in unlock_stations):
-        data["mission"] = "隱藏"
-        data["tips"] = "隱藏"
-        data["exit"] = "隱藏"
         
     return jsonify(data)
 
@@ -137,39 +121,184 @@ def next_collapse_time():
     return jsonify(core.collapse.next_time)
 
 
+@api.route("/prison_time/<name>")
+def prison_time(name: str):
+    """Get the remaining time (second) of the imprisonment of the team, `null` if the team is not imprisoned."""
+    
+    if not is_player():
+        abort(403)
+        
+    if name not in core.teams:
+        return STATUS_CODES.S00004
+    
+    return jsonify(core.prison_remaining(name))
+
+
 @api.route("/combo")
 def combo():
-    """Get the combo of the game."""
+    """Get the combo of the game. Supports `If-None-Match`, 304 if nothing changed."""
     
     
     if not is_player():
         abort(403)
     
-    return jsonify(load_data("combo"))
+    return static_json("combo", load_data("combo")).response(private=True)
+
+
+def _sees_secret(team: Team) -> bool:
+    
+    # 卡片及選項只給隊伍本身及管理員
+    if is_admin():
+        return True
+    
+    current_user = get_current_user()
+    
+    return current_user is not None and core.check_player(current_user.username)[0] is team
+
+
+def _team_data(team: Team) -> dict:
+    
+    # 預設不含紀錄，需要完整紀錄時加上 ?logs=1
+    if request.args.get("logs", 0, type=int):
+        data = team.to_public_dict()
+    else:
+        data = team.summary()
+        
+    if _sees_secret(team):
+        data.update(team.to_dict(SECRET_FIELDS))
+        
+    return data
 
 
 @api.route("/teams")
 def teams():
-    """Get the `list` of teams."""
+    """
+    Get the `list` of teams, without logs unless `?logs=1`. \\
+    With `?since=<version>`, only get the changes after the version (see :meth:`Core.changes`), or 304 if nothing changed.
+    """
     
     
     if not is_player():
         abort(403)
         
-    return jsonify([team.__dict__ for team in core.teams.values()])
+    since = request.args.get("since", type=int)
+    
+    if since is None:
+        response = jsonify([_team_data(team) for team in core.teams.values()])
+        response.headers["X-State-Version"] = core.version
+        return response
+    
+    data = core.changes(since)
+    
+    if data is None:
+        return "", 304
+        
+    return jsonify(data)
 
 
 @api.route("/team/<name>")
 def team(name: str):
-    """Get the information of the team."""
+    """
+    Get the information of the team, without logs unless `?logs=1`. \\
+    With `?since=<version>`, only get the changes after the version, or 304 if nothing changed.
+    """
     
     if not is_player():
         abort(403)
     
-    if name in core.teams:
-        return jsonify(core.teams[name].__dict__)
+    if name not in core.teams:
+        return jsonify({})
+    
+    since = request.args.get("since", type=int)
+    
+    if since is None or since < core.sync_version or since > core.version:
+        response = jsonify(_team_data(core.teams[name]))
+        response.headers["X-State-Version"] = core.version
+        return response
+    
+    data = core.team_changes(name, since)
+    
+    if not _sees_secret(core.teams[name]):
+        data = {field: value for field, value in data.items() if field not in SECRET_FIELDS}
     
-    return jsonify({})
+    if len(data) == 1:
+        return "", 304
+    
+    response = jsonify(data)
+    response.headers["X-State-Version"] = core.version
+    return response
+
+
+@api.route("/team/<name>/<any(point_log, event_log):kind>")
+def team_log(name: str, kind: str):
+    """
+    Get the point log or event log of the team page by page.
+    
+    Parameters
+    ----------
+    name: :type:`str`
+        The name of the team.
+        
+    kind: :type:`str`
+        `point_log` or `event_log`.
+        
+    Query Parameters
+    ----------------
+    cursor: :type:`int`
+        The index of the first entry. Default is 0.
+        
+    limit: :type:`int`
+        The number of entries. Default is `LOG_PAGE_SIZE`, at most `MAX_LOG_PAGE_SIZE`.
+        
+    format: :type:`str`
+        `ndjson` to stream every entry as one json per line, `cursor` and `limit` are ignored.
+        
+    Returns
+    -------
+    data: :type:`dict`
+        - entries: :type:`list[dict]`
+            The log entries.
+            
+        - next_cursor: :type:`int` | :type:`None`
+            The cursor of the next page, or `None` if this is the last page.
+            
+        - total: :type:`int`
+            The number of entries.
+            
+    Status Codes
+    ------------
+    - S00004: The team does not exist.
+    """
+    
+    if not is_player():
+        abort(403)
+        
+    if name not in core.teams:
+        return STATUS_CODES.S00004
+    
+    entries = getattr(core.teams[name], kind)
+    
+    if request.args.get("format") == "ndjson":
+        # 複製一份清單，串流時新增的紀錄不影響輸出
+        snapshot = list(entries)
+        
+        def generate():
+            for entry in snapshot:
+                yield json.dumps(entry, ensure_ascii=False) + "\n"
+                
+        return Response(generate(), mimetype="application/x-ndjson")
+    
+    cursor = max(request.args.get("cursor", 0, type=int), 0)
+    limit = min(max(request.args.get("limit", LOG_PAGE_SIZE, type=int), 1), MAX_LOG_PAGE_SIZE)
+    
+    page = entries[cursor:cursor + limit]
+    end = cursor + len(page)
+    
+    return jsonify({
+        "entries": page,
+        "next_cursor": end if end < len(entries) else None,
+        "total": len(entries),
+    })
 
 
 @api.route("/join_team/<name>/<player_name>")
@@ -206,18 +335,7 @@ def join_team(name: str, player_name: str):
     if name not in core.teams:
         return STATUS_CODES.S00004
 
-    current_team, admin = core.check_player(player_name)
-    
-    if current_team is not None:
-        if admin:
-            core.teams[current_team].admins.remove(player_name)
-        else:
-            core.teams[current_team].players.remove(player_name)
-
-    core.teams[name].players.append(player_name)
-    
-    if player_name in core.unknown_players: 
-        core.unknown_players.remove(player_name)
+    core.join_team(name, player_name)
         
     return STATUS_CODES.S00000
 
@@ -250,14 +368,8 @@ def leave_team(player_name: str):
     if core.is_running is False:
         return STATUS_CODES.S99999
         
-    for team in core.teams.values():
-        if player_name in team.players:
-            team.players.remove(player_name)
-            return STATUS_CODES.S00000
-        
-        if player_name in team.admins:
-            team.admins.remove(player_name)
-            return STATUS_CODES.S00000
+    if core.leave_team(player_name):
+        return STATUS_CODES.S00000
             
     return STATUS_CODES.S30002
     
@@ -322,28 +434,33 @@ def move(name: str):
     if not is_admin():
         abort(403)
                 
-    if core.is_running is False:
-        return STATUS_CODES.S99999
+    with core.lock():
+        if core.is_running is False:
+            return STATUS_CODES.S99999
         
-    if name not in core.teams:
-        return STATUS_CODES.S00004
+        if name not in core.teams:
+            return STATUS_CODES.S00004
         
-    if core.teams[name].is_imprisoned:
-        return STATUS_CODES.S20002
+        if core.teams[name].is_imprisoned:
+            return STATUS_CODES.S20002
     
-    if not core.teams[name].current_mission_finished:
-        return STATUS_CODES.S50002
+        if not core.teams[name].current_mission_finished:
+            return STATUS_CODES.S50002
     
-    if core.teams[name].target_location != core.teams[name].location:
-        return STATUS_CODES.S40002
+        if core.teams[name].target_location != core.teams[name].location:
+            return STATUS_CODES.S40002
     
-    if core.teams[name].step == 0:
-        core.teams[name].step = core.dice()
-        core.teams[name].add_event_log(f"Rolled a {core.teams[name].step} on the dice")
+        if core.teams[name].step == 0:
+            core.teams[name].step = core.dice()
+            core.teams[name].add_event_log(f"Rolled a {core.teams[name].step} on the dice")
+            core.notify_team(name, "step")
+            
+        step = core.teams[name].step
         
+    # 只有擲骰需要狀態鎖，計算可移動的車站不必讓其他請求等待
     return jsonify({
-        "step": core.teams[name].step,
-        "choice": core.move(name=name, step=core.teams[name].step)
+        "step": step,
+        "choice": core.move(name=name, step=step)
     })
 
 
@@ -379,29 +496,31 @@ def move_to_location(name: str, location: str):
     if not is_admin():
         abort(403)
                 
-    if core.is_running is False:
-        return STATUS_CODES.S99999
+    with core.lock():
+        if core.is_running is False:
+            return STATUS_CODES.S99999
         
-    if name not in core.teams:
-        return STATUS_CODES.S00004
+        if name not in core.teams:
+            return STATUS_CODES.S00004
         
-    if core.teams[name].is_imprisoned:
-        return STATUS_CODES.S20002
+        if core.teams[name].is_imprisoned:
+            return STATUS_CODES.S20002
     
-    if not core.teams[name].current_mission_finished:
-        return STATUS_CODES.S50002
+        if not core.teams[name].current_mission_finished:
+            return STATUS_CODES.S50002
     
-    location = location.replace("_", "/")
+        location = location.replace("_", "/")
         
-    if location not in core.teams[name].choice:
-        return STATUS_CODES.S00006
+        if location not in core.teams[name].choice:
+            return STATUS_CODES.S00006
     
-    core.teams[name].choice = []
-    core.teams[name].step = 0
+        core.teams[name].choice = []
+        core.teams[name].step = 0
+        core.notify_team(name, "choice", "step")
     
-    core.move_to_location(name=name, location=location)
+        core.move_to_location(name=name, location=location)
         
-    return STATUS_CODES.S00000
+        return STATUS_CODES.S00000
 
 @api.route("/arrive_target/<name>")
 def arrive_target(name: str):
@@ -432,21 +551,22 @@ def arrive_target(name: str):
     if not is_admin():
         abort(403)
                 
-    if core.is_running is False:
-        return STATUS_CODES.S99999
+    with core.lock():
+        if core.is_running is False:
+            return STATUS_CODES.S99999
         
-    if name not in core.teams:
-        return STATUS_CODES.S00004
+        if name not in core.teams:
+            return STATUS_CODES.S00004
         
-    if core.teams[name].is_imprisoned:
-        return STATUS_CODES.S20002
+        if core.teams[name].is_imprisoned:
+            return STATUS_CODES.S20002
     
-    if not core.teams[name].current_mission_finished:
-        return STATUS_CODES.S50002
+        if not core.teams[name].current_mission_finished:
+            return STATUS_CODES.S50002
     
-    core.arrive_target(name=name)
+        core.arrive_target(name=name)
         
-    return STATUS_CODES.S00000
+        return STATUS_CODES.S00000
 
 @api.route("/set_station/<name>/<station>")
 def set_station(name: str, station: str):
@@ -478,28 +598,30 @@ def set_station(name: str, station: str):
     if not is_admin():
         abort(403)
 
-    if core.is_running is False:
-        return STATUS_CODES.S99999
+    with core.lock():
+        if core.is_running is False:
+            return STATUS_CODES.S99999
 
-    if name not in core.teams:
-        return STATUS_CODES.S00004
+        if name not in core.teams:
+            return STATUS_CODES.S00004
 
-    station = station.replace("_", "/")
+        station = station.replace("_", "/")
 
-    if core.metro.find_station(station) is None:
-        return STATUS_CODES.S00006
+        if core.metro.find_station(station) is None:
+            return STATUS_CODES.S00006
     
-    if core.teams[name].start_location_defined:
-        return STATUS_CODES.S20004
+        if core.teams[name].start_location_defined:
+            return STATUS_CODES.S20004
 
-    core.teams[name].location = station
-    core.teams[name].target_location = station
-    core.teams[name].start_location_defined = True
+        core.teams[name].location = station
+        core.teams[name].target_location = station
+        core.teams[name].start_location_defined = True
 
-    core.teams[name].add_event_log(f"Set starting station to {station}")
-    log.log(INFO, f"{YELLOW_TEXT_COLOR}{name} set starting station to {station}{RESET_TEXT_COLOR}")
+        core.teams[name].add_event_log(f"Set starting station to {station}")
+        core.notify_team(name, "location", "target_location", "start_location_defined")
+        log.log(INFO, f"{YELLOW_TEXT_COLOR}{name} set starting station to {station}{RESET_TEXT_COLOR}")
 
-    return STATUS_CODES.S00000
+        return STATUS_CODES.S00000
 
 @api.route("/add_point/<name>/<point>")
 def add_point(name: str, point: int):
@@ -529,23 +651,24 @@ def add_point(name: str, point: int):
     if not is_admin():
         abort(403)
                 
-    if core.is_running is False:
-        return STATUS_CODES.S99999
+    with core.lock():
+        if core.is_running is False:
+            return STATUS_CODES.S99999
         
-    if name not in core.teams:
-        return STATUS_CODES.S00004
+        if name not in core.teams:
+            return STATUS_CODES.S00004
     
-    point = int(point)
+        point = int(point)
         
-    core.teams[name].point += point
+        core.teams[name].point += point
     
-    bearer_client = APIClient(session.get("token"), bearer=True)
-    current_user = bearer_client.users.get_current_user()        
+        current_user = get_current_user()
     
-    log.log(INFO, f"{YELLOW_TEXT_COLOR}User \"{current_user.username}\" added {point} point(s) to {name}{RESET_TEXT_COLOR}")
-    core.teams[name].add_point_log(point, f"By {current_user.username}")
+        log.log(INFO, f"{YELLOW_TEXT_COLOR}User \"{current_user.username}\" added {point} point(s) to {name}{RESET_TEXT_COLOR}")
+        core.teams[name].add_point_log(point, f"By {current_user.username}")
+        core.notify_team(name, "point")
     
-    return STATUS_CODES.S00000
+        return STATUS_CODES.S00000
 
 
 @api.route("/set_point/<name>/<point>")
@@ -576,22 +699,23 @@ def set_point(name: str, point: int):
     if not is_admin():
         abort(403)
                 
-    if core.is_running is False:
-        return STATUS_CODES.S99999
+    with core.lock():
+        if core.is_running is False:
+            return STATUS_CODES.S99999
         
-    if name not in core.teams:
-        return STATUS_CODES.S00004
+        if name not in core.teams:
+            return STATUS_CODES.S00004
     
-    point = int(point)
+        point = int(point)
     
-    bearer_client = APIClient(session.get("token"), bearer=True)
-    current_user = bearer_client.users.get_current_user()
+        current_user = get_current_user()
 
-    log.log(INFO, f"{YELLOW_TEXT_COLOR}User \"{current_user.username}\" set {name}'s points to {point}{RESET_TEXT_COLOR}")
-    core.teams[name].add_point_log(point - core.teams[name].point, f"By {current_user.username}")
-    core.teams[name].point = point
+        log.log(INFO, f"{YELLOW_TEXT_COLOR}User \"{current_user.username}\" set {name}'s points to {point}{RESET_TEXT_COLOR}")
+        core.teams[name].add_point_log(point - core.teams[name].point, f"By {current_user.username}")
+        core.teams[name].point = point
+        core.notify_team(name, "point")
     
-    return STATUS_CODES.S00000
+        return STATUS_CODES.S00000
 
 
 @api.route("/finish_mission/<name>")
@@ -623,24 +747,25 @@ def finish_mission(name: str):
     if not is_admin():
         abort(403)
                 
-    if core.is_running is False:
-        return STATUS_CODES.S99999
+    with core.lock():
+        if core.is_running is False:
+            return STATUS_CODES.S99999
     
-    if name not in core.teams:
-        return STATUS_CODES.S00004
+        if name not in core.teams:
+            return STATUS_CODES.S00004
     
-    if core.teams[name].is_imprisoned:
-        return STATUS_CODES.S20002
+        if core.teams[name].is_imprisoned:
+            return STATUS_CODES.S20002
     
-    if core.teams[name].current_mission_finished:
-        return STATUS_CODES.S50003
+        if core.teams[name].current_mission_finished:
+            return STATUS_CODES.S50003
     
-    # 廢案 由於GPS在捷運站精確度不達預期標準 因此取消此功能
-    # if core.teams[name].target_location != core.teams[name].location:
-    #     return STATUS_CODES.S40002
+        # 廢案 由於GPS在捷運站精確度不達預期標準 因此取消此功能
+        # if core.teams[name].target_location != core.teams[name].location:
+        #     return STATUS_CODES.S40002
     
-    card = core.finish_mission(name=name)
-    return STATUS_CODES.S00000 if card is None else card
+        card = core.finish_mission(name=name)
+        return STATUS_CODES.S00000 if card is None else card
 
 
 @api.route("/skip_mission/<name>")
@@ -672,24 +797,25 @@ def skip_mission(name: str):
     if not is_admin():
         abort(403)
                 
-    if core.is_running is False:
-        return STATUS_CODES.S99999
+    with core.lock():
+        if core.is_running is False:
+            return STATUS_CODES.S99999
     
-    if name not in core.teams:
-        return STATUS_CODES.S00004
+        if name not in core.teams:
+            return STATUS_CODES.S00004
     
-    if core.teams[name].is_imprisoned:
-        return STATUS_CODES.S20002
+        if core.teams[name].is_imprisoned:
+            return STATUS_CODES.S20002
     
-    if core.teams[name].current_mission_finished:
-        return STATUS_CODES.S50003
+        if core.teams[name].current_mission_finished:
+            return STATUS_CODES.S50003
     
-    # 廢案 由於GPS在捷運站精確度不達預期標準 因此取消此功能
-    # if core.teams[name].target_location != core.teams[name].location:
-    #     return STATUS_CODES.S40002
+        # 廢案 由於GPS在捷運站精確度不達預期標準 因此取消此功能
+        # if core.teams[name].target_location != core.teams[name].location:
+        #     return STATUS_CODES.S40002
     
-    core.skip_mission(name=name)
-    return STATUS_CODES.S00000
+        core.skip_mission(name=name)
+        return STATUS_CODES.S00000
 
 
 @api.route("/gps_location/<name>/<latitude>/<longitude>")
@@ -744,7 +870,77 @@ def gps_location(name: str, latitude: float, longitude: float):
     
     log.debug(f"Team {name} is at {longitude}, {latitude}")
     
-    return jsonify(core.check_pos(name, pgh.encode(latitude, longitude)))
+    return jsonify(core.check_pos(name, latitude, longitude))
+
+
+@api.route("/gps_locations", methods=["POST"])
+def gps_locations():
+    """
+    Update the GPS locations of many teams in one request. \\
+    The request body is a `list` of readings, e.g. `[{"team": "零小", "lat": 25.04, "lon": 121.51, "ts": 1700000000}]`. \\
+    `ts` is optional, if a team has more than one reading, only the newest one is used. \
+    Malformed readings are skipped, the others are still applied.
+        
+    Returns
+    -------
+    result: :type:`str` | :type:`dict`
+        The status code or the result of every team.
+        
+        - teams: :type:`dict[str, dict | str]`
+            The result of the check position of every team, or the status code of its reading.
+            
+        - rejected: :type:`list[int]`
+            The indexes of the malformed readings.
+        
+    Status Codes
+    ------------
+    - S00001: The request body is not a `list`.
+    - S00004: The team does not exist.
+    - S00006: The location does not exist.
+    - S99999: The game is not running
+    """
+    
+    if not is_admin():
+        abort(403)
+                
+    if core.is_running is False:
+        return STATUS_CODES.S99999
+    
+    body = request.get_json(silent=True)
+    
+    if not isinstance(body, list):
+        return STATUS_CODES.S00001
+    
+    data = {}
+    readings = []
+    rejected = []
+    
+    for index, reading in enumerate(body):
+        try:
+            name = str(reading["team"])
+            latitude = float(reading["lat"])
+            longitude = float(reading["lon"])
+            ts = float(reading["ts"]) if reading.get("ts") is not None else None
+        except (KeyError, TypeError, ValueError, AttributeError):
+            # 離線時累積的讀數不因其中一筆格式錯誤而全部遺失
+            rejected.append(index)
+            continue
+        
+        if name not in core.teams:
+            data[name] = STATUS_CODES.S00004
+            
+        elif longitude > 180 or longitude < -180 or latitude > 90 or latitude < -90:
+            data[name] = STATUS_CODES.S00006
+            
+        else:
+            readings.append((name, latitude, longitude, ts))
+            
+    log.debug(f"Received {len(readings)} GPS reading(s), rejected {len(rejected)}.")
+    
+    data.update(core.check_positions(readings))
+    
+    # 隊伍名稱與rejected分開，不會與名為rejected的隊伍衝突
+    return jsonify({"teams": data, "rejected": rejected})
 
 
 @api.route("/users")
@@ -761,4 +957,4 @@ def get_users():
     if not is_admin():
         abort(403)
     
-    return jsonify(core.unknown_players)
\ No newline at end of file
+    return jsonify(list(core.unknown_players))
\ No newline at end of file
@@ -1,15 +1,14 @@
-import io
 import os
 import logging
-import json
 import zipfile
-from flask import abort, Blueprint, Response, render_template, redirect, send_file, send_from_directory, session
-from zenora import APIClient
+from flask import abort, Blueprint, Response, render_template, redirect, send_file, send_from_directory
 
 from ..core import core
 from ..data import load_data
 from ..config import BASEDIR
 from ..modules.checker import is_game_admin, is_admin
+from ..modules.identity import get_current_user
+from ..modules.static_json import static_json
 from ..game_config import GAME_ADMIN_TEAM_NAME
 
 
@@ -27,9 +26,8 @@ def checking(response: Response):
 
 @main.route("/")
 def index():
-    if "token" in session:
-        bearer_client = APIClient(session.get("token"), bearer=True)
-        current_user = bearer_client.users.get_current_user()
+    current_user = get_current_user()
+    if current_user is not None:
         team, _ = core.check_player(current_user.username)
         if team is None and is_game_admin():
             team = GAME_ADMIN_TEAM_NAME
@@ -41,9 +39,8 @@ def index():
 
 @main.route("/admin")
 def admin():
-    if "token" in session:
-        bearer_client = APIClient(session.get("token"), bearer=True)
-        current_user = bearer_client.users.get_current_user()
+    current_user = get_current_user()
+    if current_user is not None:
         team, is_admin = core.check_player(current_user.username)
 
         if team is None and is_game_admin():
@@ -57,18 +54,13 @@ def admin():
 
 @main.route("/download_graph")
 def download_graph():
-    with io.StringIO() as file:
-        json.dump(core.metro.graph, file, ensure_ascii=False, indent=4)
-        response = send_file(file.name, as_attachment=True, download_name="graph.json")
-        
-    return response
+    return static_json("graph_file", core.metro.graph, indent=4).response(download_name="graph.json")
 
 
 @main.route("/combo")
 def combo():
-    if "token" in session:
-        bearer_client = APIClient(session.get("token"), bearer=True)
-        current_user = bearer_client.users.get_current_user()
+    current_user = get_current_user()
+    if current_user is not None:
         team, _ = core.check_player(current_user.username)
 
         if team is None and is_game_admin():
@@ -81,9 +73,8 @@ def combo():
 
 @main.route("/team_admin")
 def team_admin():
-    if "token" in session:
-        bearer_client = APIClient(session.get("token"), bearer=True)
-        current_user = bearer_client.users.get_current_user()
+    current_user = get_current_user()
+    if current_user is not None:
         team, _ = core.check_player(current_user.username)
         
         if team is None and is_game_admin():
@@ -97,9 +88,8 @@ def team_admin():
 
 @main.route("/card")
 def card():
-    if "token" in session:
-        bearer_client = APIClient(session.get("token"), bearer=True)
-        current_user = bearer_client.users.get_current_user()
+    current_user = get_current_user()
+    if current_user is not None:
         team, _ = core.check_player(current_user.username)
 
         if team is None and is_game_admin():
@@ -113,9 +103,8 @@ def card():
 
 @main.route("/dice")
 def dice():
-    if "token" in session:
-        bearer_client = APIClient(session.get("token"), bearer=True)
-        current_user = bearer_client.users.get_current_user()
+    current_user = get_current_user()
+    if current_user is not None:
         team, _ = core.check_player(current_user.username)
 
         if team is None and is_game_admin():
@@ -129,9 +118,8 @@ def dice():
 
 @main.route("/initialization")
 def initialization():
-    if "token" in session:
-        bearer_client = APIClient(session.get("token"), bearer=True)
-        current_user = bearer_client.users.get_current_user()
+    current_user = get_current_user()
+    if current_user is not None:
         team, _ = core.check_player(current_user.username)
 
         if team is None and is_game_admin():
@@ -151,8 +139,7 @@ def server_log():
     if not is_game_admin():
         abort(404)
 
-    bearer_client = APIClient(session.get("token"), bearer=True)
-    current_user = bearer_client.users.get_current_user()
+    current_user = get_current_user()
     
     log.info(f"{current_user.username}({current_user.id}) is checking the log file")
     
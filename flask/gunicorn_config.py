@@ -1,12 +1,15 @@
 """Gunicorn configuration file for Flask-SocketIO application."""
 import multiprocessing
+import os
 
 # Server socket
 bind = "0.0.0.0:8080"
 backlog = 2048
 
 # Worker processes
-workers = 1
+# More than one worker needs REDIS_URL for the shared game state and socketio messages,
+# and sticky sessions (e.g. ip_hash in nginx) for the socketio polling transport
+workers = int(os.getenv("GUNICORN_WORKERS", "1"))
 worker_class = "gevent"
 worker_connections = 1000
 timeout = 120
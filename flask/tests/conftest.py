@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+
+# 測試直接匯入app套件
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app(tmp_path):
+    """An app context with an empty database."""
+
+    from app.models import db
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'db.sqlite3'}"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        yield app
@@ -0,0 +1,129 @@
+import threading
+
+import fakeredis
+import pytest
+
+from app.core import Core
+from app.core.backend import RedisBackend
+
+
+@pytest.fixture
+def workers(app):
+    """Two workers sharing the state through one Redis server."""
+
+    server = fakeredis.FakeServer()
+    workers = [Core(RedisBackend(fakeredis.FakeRedis(server=server))) for _ in range(2)]
+
+    for worker in workers:
+        worker.recover()
+
+    yield workers
+
+    for worker in workers:
+        worker.scheduler.shutdown()
+
+
+def add_point(worker: Core, name: str, point: int) -> None:
+    # 與 /api/add_point 相同，從檢查到notify_team都在狀態鎖內
+    with worker.lock():
+        worker.teams[name].point += point
+        worker.teams[name].add_point_log(point, "test")
+        worker.notify_team(name, "point")
+
+
+def test_workers_start_the_same_game(workers: list[Core]):
+    a, b = workers
+
+    # 第二個worker重播第一個worker發布的開局，隨機的特殊站和隱藏站相同
+    assert a.metro.snapshot_stations() == b.metro.snapshot_stations()
+
+
+def test_add_point_on_two_workers(workers: list[Core]):
+    a, b = workers
+    name = next(iter(a.teams))
+    start = a.teams[name].point
+
+    add_point(a, name, 5)
+    add_point(b, name, 7)
+
+    a.sync_backend()
+    b.sync_backend()
+
+    for worker in workers:
+        assert worker.teams[name].point == start + 12
+        assert [entry["point"] for entry in worker.teams[name].point_log] == [5, 7]
+
+
+def test_concurrent_add_point(workers: list[Core]):
+    a, b = workers
+    name = next(iter(a.teams))
+    start = a.teams[name].point
+    count = 20
+
+    threads = [
+        threading.Thread(target=lambda worker=worker, point=point: [add_point(worker, name, point) for _ in range(count)])
+        for worker, point in ((a, 1), (b, 100))
+    ]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    a.sync_backend()
+    b.sync_backend()
+
+    # 帳目與總分一致，且每個worker的紀錄順序相同
+    for worker in workers:
+        assert worker.teams[name].point == start + count * 101
+        assert worker.teams[name].point == start + sum(entry["point"] for entry in worker.teams[name].point_log)
+
+    assert a.teams[name].point_log == b.teams[name].point_log
+    assert a.version == b.version
+
+
+def test_collapse_damage_and_toll(workers: list[Core]):
+    a, b = workers
+    name = next(iter(a.teams))
+    start = a.teams[name].point
+
+    a.collapse.add([a.teams[name].location])
+    a.is_running = b.is_running = True
+    b.collapse.add([b.teams[name].location])
+
+    a._collapse_damage()
+    add_point(b, name, -3)
+
+    a.sync_backend()
+
+    assert a.teams[name].point == b.teams[name].point
+    assert b.teams[name].point == start + sum(entry["point"] for entry in b.teams[name].point_log)
+
+
+def test_records_are_trimmed_after_backup(workers: list[Core]):
+    a, b = workers
+    name = next(iter(a.teams))
+    start = a.teams[name].point
+
+    add_point(a, name, 5)
+    a.backup()
+
+    # 已備份的紀錄被刪除，b尚未讀取的變動由備份還原
+    assert a.backend.client.llen("mrt:records") == 0
+    add_point(a, name, 7)
+    b.sync_backend()
+
+    assert b.teams[name].point == start + 12
+    assert [entry["point"] for entry in b.teams[name].point_log] == [5, 7]
+    assert a.version == b.version
+
+
+def test_state_lock_is_released(workers: list[Core]):
+    a, b = workers
+
+    with a.lock():
+        assert not b.backend.acquire_lock("state", 1)
+
+    assert b.backend.acquire_lock("state", 1)
+    b.backend.release_lock("state")
+    assert a.backend.acquire_lock("state", 1)
@@ -0,0 +1,157 @@
+import threading
+
+import pytest
+
+from app.core import Core, team_room, TEAMS_ROOM
+from app.core.backend import LocalBackend
+from app.core.journal import Journal
+from app.models import db
+from app.models.teams import Teams
+
+
+@pytest.fixture
+def core():
+    core = Core(LocalBackend())
+
+    yield core
+
+    core.scheduler.shutdown()
+
+
+def test_snapshot_does_not_wait_for_changes(core: Core):
+    name = next(iter(core.teams))
+    before = core.snapshot()
+
+    holding = threading.Event()
+    done = threading.Event()
+
+    def change():
+        with core.lock():
+            core.teams[name].point += 5
+            holding.set()
+            done.wait(5)
+            core.notify_team(name, "point")
+
+    thread = threading.Thread(target=change)
+    thread.start()
+    holding.wait(5)
+
+    try:
+        # 變動進行中只拿到上一份完整的快照
+        snapshot = core.snapshot()
+        assert snapshot.teams[name]["point"] == before.teams[name]["point"]
+    finally:
+        done.set()
+        thread.join()
+
+    assert core.snapshot().teams[name]["point"] == before.teams[name]["point"] + 5
+
+
+class FakeServer:
+    """Record the rooms of every socketio connection."""
+
+    def __init__(self):
+        self.rooms: dict[str, set[str]] = {}
+
+    def enter_room(self, sid, room, namespace=None):
+        self.rooms.setdefault(sid, set()).add(room)
+
+    def leave_room(self, sid, room, namespace=None):
+        self.rooms.setdefault(sid, set()).discard(room)
+
+
+class FakeSocketIO:
+
+    def __init__(self):
+        self.server = FakeServer()
+        self.events: list[tuple[str, object]] = []
+
+    def emit(self, event, data=None, to=None):
+        self.events.append((event, to))
+
+
+def test_rooms_follow_team_changes(core: Core):
+    socketio = FakeSocketIO()
+    core.init_socketio(socketio)
+    name = next(iter(core.teams))
+
+    core.connect_player("new_player", "sid")
+    assert socketio.server.rooms.get("sid", set()) == set()
+
+    # 連線後才加入隊伍，也要收到隊伍的完整變動
+    core.join_team(name, "new_player")
+    assert socketio.server.rooms["sid"] == {TEAMS_ROOM, team_room(name)}
+
+    core.leave_team("new_player")
+    assert socketio.server.rooms["sid"] == set()
+
+    core.join_team(name, "new_player")
+    core.delete_team(name)
+    assert team_room(name) not in socketio.server.rooms["sid"]
+
+
+def start_worker(journal_path) -> Core:
+    core = Core(LocalBackend())
+    core.journal = Journal(str(journal_path))
+    core.recover()
+
+    return core
+
+
+def add_point(core: Core, name: str, point: int) -> None:
+    with core.lock():
+        core.teams[name].point += point
+        core.teams[name].add_point_log(point, "test")
+        core.notify_team(name, "point")
+
+
+def test_recover_after_quiet_period(app, tmp_path):
+    first = start_worker(tmp_path / "journal.ndjson")
+    name = next(iter(first.teams))
+    point = first.teams[name].point
+
+    add_point(first, name, 5)
+    first.backup()
+    stations = first.metro.snapshot_stations()
+    first.scheduler.shutdown()
+
+    # 備份後沒有新的變動，重啟時仍要還原備份而不是開始新的遊戲
+    second = start_worker(tmp_path / "journal.ndjson")
+    second.scheduler.shutdown()
+
+    assert second.teams[name].point == point + 5
+    assert second.metro.snapshot_stations() == stations
+
+
+def test_recover_after_failed_compact(app, tmp_path, monkeypatch):
+    first = start_worker(tmp_path / "journal.ndjson")
+    name = next(iter(first.teams))
+    point = first.teams[name].point
+
+    add_point(first, name, 5)
+    # 資料庫已寫入但journal沒有清除
+    monkeypatch.setattr(first.journal, "compact", lambda version: None)
+    first.backup()
+    add_point(first, name, 7)
+    first.journal.flush()
+    first.scheduler.shutdown()
+
+    second = start_worker(tmp_path / "journal.ndjson")
+    second.scheduler.shutdown()
+
+    assert second.teams[name].point == point + 12
+    assert [entry["point"] for entry in second.teams[name].point_log] == [5, 7]
+
+
+def test_restore_legacy_imprisoned_time(app, core: Core):
+    name = next(iter(core.teams))
+    core.backup()
+
+    # 舊版存的是剩餘的分鐘數
+    Teams.query.filter_by(name=name).update({"is_imprisoned": True, "imprisoned_time": 15})
+    db.session.commit()
+
+    core.restore()
+
+    assert core.teams[name].is_imprisoned
+    assert abs(core.prison_remaining(name) - 15 * 60) <= 1
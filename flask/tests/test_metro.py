@@ -0,0 +1,67 @@
+import pytest
+
+from app.core.metro import MetroSystem
+
+
+class RecursiveMove:
+    """The recursive DFS of :meth:`Core.move` before it was moved to :func:`reach`, kept as the reference."""
+
+    def __init__(self, graph: dict[str, list[str]]) -> None:
+        self.graph = graph
+
+
+    def move(self, current_station: str, step: int) -> list[str]:
+        self.choice = {i: [] for i in range(1, step + 1)}
+        self.visited = []
+        self._move(current_station, step)
+
+        return self.choice[step]
+
+
+    def _move(self, current_station: str, target_deep: int, deep: int=1) -> list[str]:
+        choice = []
+
+        if deep > target_deep or current_station in self.visited:
+            return choice
+
+        self.visited.append(current_station)
+
+        for station in self.graph.get(current_station):
+            if station not in self.visited: choice.append(station)
+            choice.extend(self._move(station, target_deep, deep + 1))
+
+        for s in choice:
+            if s not in self.choice[deep]:
+                self.choice[deep].append(s)
+
+        return choice
+
+
+@pytest.fixture(scope="module")
+def metro() -> MetroSystem:
+    return MetroSystem()
+
+
+@pytest.mark.parametrize("step", range(1, 7))
+def test_reachable_stations_match_recursive_dfs(metro: MetroSystem, step: int):
+    reference = RecursiveMove(metro.graph)
+
+    for name in metro.graph:
+        assert metro.reachable_stations(name, step) == reference.move(name, step), name
+
+
+def test_reachable_stations_beyond_precomputed_steps(metro: MetroSystem):
+    reference = RecursiveMove(metro.graph)
+
+    for name in metro.graph:
+        assert metro.reachable_stations(name, 12) == reference.move(name, 12), name
+
+
+def test_csr_matches_graph(metro: MetroSystem):
+    for name, neighbors in metro.graph.items():
+        index = metro.ids[name]
+        assert [metro.names[i] for i in metro.neighbors[metro.offsets[index]:metro.offsets[index + 1]]] == neighbors
+
+
+def test_unknown_station(metro: MetroSystem):
+    assert metro.reachable_stations("unknown", 3) == []
@@ -0,0 +1,19 @@
+from app.core.team import Team, SECRET_FIELDS
+
+
+def test_public_data_has_no_secret_fields():
+    team = Team("零小", ["player"])
+    team.current_card = "命運卡"
+    team.choice = ["中山", "台北車站"]
+    team.add_point_log(3, "mission")
+
+    public = team.to_public_dict()
+    summary = team.summary()
+
+    for field in SECRET_FIELDS:
+        assert field not in public
+        assert field not in summary
+
+    # 完整資料仍包含紀錄
+    assert public["point_log"] == team.point_log
+    assert summary["point_log_count"] == 1
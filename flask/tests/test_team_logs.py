@@ -0,0 +1,39 @@
+import pickle
+
+from flask import Flask
+
+from app.models import db
+from app.models.team_logs import migrate_legacy_logs, load_team_logs
+
+
+def test_migrate_legacy_logs(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'db.sqlite3'}"
+    db.init_app(app)
+
+    with app.app_context():
+        # 舊版資料庫把紀錄pickle在teams的欄位
+        db.session.execute(db.text(
+            "CREATE TABLE teams (id INTEGER PRIMARY KEY, name VARCHAR(32) UNIQUE NOT NULL, "
+            "point_log BLOB, event_log BLOB, stations BLOB, owned_stations BLOB)"
+        ))
+        db.session.execute(db.text("INSERT INTO teams (name, point_log, event_log, stations, owned_stations) VALUES (:name, :point_log, :event_log, :stations, :owned_stations)"), {
+            "name": "零小",
+            "point_log": pickle.dumps([{"point": 3, "reason": "mission", "time": "2024-01-01 10:00:00"}]),
+            "event_log": pickle.dumps([{"event": "Moved", "time": "2024-01-01 10:00:00"}]),
+            "stations": pickle.dumps(["台北車站", "中山"]),
+            "owned_stations": pickle.dumps(["中山"]),
+        })
+        db.session.commit()
+        db.create_all()
+
+        assert migrate_legacy_logs() == 5
+        # 只搬移一次
+        assert migrate_legacy_logs() == 0
+
+        assert load_team_logs() == {"零小": {
+            "point_log": [{"point": 3, "reason": "mission", "time": "2024-01-01 10:00:00"}],
+            "event_log": [{"event": "Moved", "time": "2024-01-01 10:00:00"}],
+            "stations": ["台北車站", "中山"],
+            "owned_stations": ["中山"],
+        }}